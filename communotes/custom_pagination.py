@@ -1,6 +1,395 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+DEFAULT_EXACT_COUNT_THRESHOLD = 1000
+
+
+def get_exact_count_threshold():
+    return getattr(
+        settings, "PAGINATION_EXACT_COUNT_THRESHOLD", DEFAULT_EXACT_COUNT_THRESHOLD
+    )
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows of a queryset from the planner statistics,
+    pg_class.reltuples for a whole table and the EXPLAIN row estimate
+    for a filtered queryset. Return None when there is no estimate
+    """
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 means the table was never analyzed
+            if row is None or row[0] < 0:
+                return None
+            return int(row[0])
+
+        queryset = queryset.order_by().values("pk")
+        try:
+            sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            return 0
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Paginator that counts exactly only when the planner estimates that the
+    count is cheap, otherwise count is the estimate and the pages don't depend
+    on it, each page fetches one extra item to know if there is a next page
+    """
+
+    def __init__(self, *args, estimate=None, exact_count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_is_exact = True
+        # the estimate or the count when the caller already has them
+        self.estimate = estimate
+        self.exact_count = exact_count
+
+    @cached_property
+    def count(self):
+        if self.exact_count is not None:
+            return self.exact_count
+        estimate = self.estimate
+        if estimate is None:
+            estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < get_exact_count_threshold():
+            return self.object_list.count()
+        self.count_is_exact = False
+        return estimate
+
+    def validate_number(self, number):
+        # count decides whether the count is exact, evaluate it first
+        self.count
+        if self.count_is_exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        return EstimatedPage(
+            object_list[: self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Views that define `keyset_ordering`, a tuple of model fields that ends with
+    a unique field, accept `?pagination=cursor`. In that mode the results are
+    ordered by `keyset_ordering` and each page seeks directly to the position
+    encoded in the opaque `cursor` query param, no OFFSET nor COUNT is executed.
+
+    Views that set `estimate_count` return an estimated count when counting
+    exactly is expensive, `?exact_count=true` asks for the exact count
+    """
+
     page_size_query_param = "page_size"
     max_page_size = 100
+
+    pagination_query_param = "pagination"
+    cursor_pagination_value = "cursor"
+    cursor_query_param = "cursor"
+    cursor_query_description = _("The pagination cursor value.")
+    invalid_cursor_message = _("Invalid cursor")
+
+    exact_count_query_param = "exact_count"
+    exact_count_query_description = _(
+        "Use 'true' to always count the items exactly instead of estimating."
+    )
+
+    cursor_mode = False
+    count_estimation = False
+    # set by the view before paginate_queryset, see counts_exactly
+    estimate = None
+    exact_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keyset_ordering = self.get_keyset_ordering(view)
+        if keyset_ordering and self.is_cursor_requested(request):
+            return self.paginate_queryset_by_cursor(queryset, request, keyset_ordering)
+        if getattr(view, "estimate_count", False):
+            self.count_estimation = True
+            if not self.is_exact_count_requested(request):
+                self.django_paginator_class = partial(
+                    EstimatedCountPaginator, estimate=self.estimate
+                )
+        if self.exact_count is not None:
+            self.django_paginator_class = partial(
+                EstimatedCountPaginator, exact_count=self.exact_count
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def counts_exactly(self, queryset, request, view):
+        """
+        Return whether paginate_queryset will count the queryset exactly, a view
+        that counts it anyway can set exact_count so it isn't counted again
+        """
+        keyset_ordering = self.get_keyset_ordering(view)
+        if keyset_ordering and self.is_cursor_requested(request):
+            return False
+        estimates = getattr(view, "estimate_count", False)
+        if not estimates or self.is_exact_count_requested(request):
+            return True
+        self.estimate = estimate_count(queryset)
+        return self.estimate is None or self.estimate < get_exact_count_threshold()
+
+    def get_paginated_response(self, data):
+        if self.count_estimation:
+            paginator = self.page.paginator
+            return Response(
+                OrderedDict(
+                    [
+                        ("count", paginator.count),
+                        ("count_is_exact", getattr(paginator, "count_is_exact", True)),
+                        ("next", self.get_next_link()),
+                        ("previous", self.get_previous_link()),
+                        ("results", data),
+                    ]
+                )
+            )
+        if self.cursor_mode:
+            return Response(
+                OrderedDict(
+                    [
+                        ("next", self.get_next_link()),
+                        ("previous", self.get_previous_link()),
+                        ("results", data),
+                    ]
+                )
+            )
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.cursor_mode:
+            return self.encode_cursor_link(self.next_position, reverse=False)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.cursor_mode:
+            return self.encode_cursor_link(self.previous_position, reverse=True)
+        return super().get_previous_link()
+
+    def get_keyset_ordering(self, view):
+        if hasattr(view, "get_keyset_ordering"):
+            return view.get_keyset_ordering()
+        return getattr(view, "keyset_ordering", None)
+
+    def is_cursor_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.pagination_query_param)
+            == self.cursor_pagination_value
+        )
+
+    def is_exact_count_requested(self, request):
+        value = request.query_params.get(self.exact_count_query_param, "")
+        return value.lower() in ("true", "1")
+
+    def paginate_queryset_by_cursor(self, queryset, request, keyset_ordering):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.cursor_mode = True
+        self.request = request
+        self.model = queryset.model
+        self.keyset_ordering = keyset_ordering
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(ordering, position))
+
+        # one extra item tells if there are more items after this page
+        results = list(queryset[: page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = None
+        self.previous_position = None
+        if results:
+            if has_more or reverse:
+                self.next_position = self.get_position(results[-1])
+            if (has_more and reverse) or (position is not None and not reverse):
+                self.previous_position = self.get_position(results[0])
+        elif position is not None and not reverse:
+            self.previous_position = position
+
+        return results
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return list(self.keyset_ordering)
+        return [
+            field[1:] if field.startswith("-") else "-" + field
+            for field in self.keyset_ordering
+        ]
+
+    def get_seek_filter(self, ordering, position):
+        # (a, b) after (x, y) -> a > x OR (a = x AND b > y), with the comparison
+        # inverted for descending fields
+        seek_filter = Q()
+        for index, field in enumerate(ordering):
+            field_name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{"{0}__{1}".format(field_name, lookup): position[index]})
+            for previous_field, value in zip(ordering[:index], position):
+                condition &= Q(**{previous_field.lstrip("-"): value})
+            seek_filter |= condition
+
+        # redundant bound on the leading field, lets the index scan start at the cursor
+        first_field = ordering[0]
+        lookup = "lte" if first_field.startswith("-") else "gte"
+        bound = Q(**{"{0}__{1}".format(first_field.lstrip("-"), lookup): position[0]})
+        return bound & seek_filter
+
+    def get_model_field(self, field):
+        field_name = field.lstrip("-")
+        if field_name == "pk":
+            return self.model._meta.pk
+        return self.model._meta.get_field(field_name)
+
+    def get_position(self, instance):
+        # values() rows are dicts keyed by the column attnames
+        if isinstance(instance, dict):
+            return [
+                instance[self.get_model_field(field).attname]
+                for field in self.keyset_ordering
+            ]
+        return [
+            self.get_model_field(field).value_from_object(instance)
+            for field in self.keyset_ordering
+        ]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            values = cursor["p"]
+            if len(values) != len(self.keyset_ordering):
+                raise ValueError()
+            position = [
+                self.get_model_field(field).to_python(value)
+                for field, value in zip(self.keyset_ordering, values)
+            ]
+            # the seek filter can't compare with nulls, no page has them
+            if None in position:
+                raise ValueError()
+            return position, bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in position
+        ]
+        cursor = {"p": values}
+        if reverse:
+            cursor["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if getattr(view, "estimate_count", False):
+            parameters.append(
+                {
+                    "name": self.exact_count_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": force_str(self.exact_count_query_description),
+                    "schema": {"type": "boolean"},
+                }
+            )
+        if self.get_keyset_ordering(view):
+            parameters.extend(
+                [
+                    {
+                        "name": self.pagination_query_param,
+                        "required": False,
+                        "in": "query",
+                        "description": force_str(
+                            _("Use 'cursor' to enable cursor pagination.")
+                        ),
+                        "schema": {
+                            "type": "string",
+                            "enum": [self.cursor_pagination_value],
+                        },
+                    },
+                    {
+                        "name": self.cursor_query_param,
+                        "required": False,
+                        "in": "query",
+                        "description": force_str(self.cursor_query_description),
+                        "schema": {"type": "string"},
+                    },
+                ]
+            )
+        return parameters
@@ -0,0 +1,60 @@
+from django.http.multipartparser import parse_header
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# lazy translations, datetimes, decimals... are encoded like JSONRenderer does
+encoder = encoders.JSONEncoder()
+
+
+class ORJSONRenderer(renderers.BaseRenderer):
+    """
+    Same output as JSONRenderer, written with orjson
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = self.options
+        if self.is_indented(accepted_media_type or ""):
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=encoder.default, option=options)
+        # escaped by JSONRenderer too, they end the lines of javascript strings
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+    def is_indented(self, accepted_media_type):
+        # orjson only indents with 2 spaces, any indent value uses them
+        _, params = parse_header(accepted_media_type.encode("ascii"))
+        try:
+            return int(params.get("indent", 0)) > 0
+        except ValueError:
+            return False
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encoder.default, use_bin_type=True)
@@ -1,4 +1,7 @@
 import os
+from importlib.util import find_spec
+
+from decouple import config
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -84,8 +87,49 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 AUTH_USER_MODEL = "authentication.User"
 
+# Cache settings, the local memory cache is per process, set a shared
+# backend (memcached, redis) when running several processes
+
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="communotes"),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Background tasks run in a thread pool after the transaction commits,
+# BACKGROUND_TASKS_SYNC runs them right away, in the caller thread
+
+BACKGROUND_WORKERS = 2
+BACKGROUND_TASKS_SYNC = False
+
+# Seconds between rebuilds of the in-process autocomplete indexes
+
+SUGGEST_REFRESH_INTERVAL = 30
+
 # API Settings
 
+# orjson replaces the JSON renderer and parser and MessagePack is offered
+# through content negotiation, when the packages are installed
+JSON_RENDERER, JSON_PARSER = (
+    ("communotes.renderers.ORJSONRenderer", "communotes.parsers.ORJSONParser")
+    if find_spec("orjson")
+    else ("rest_framework.renderers.JSONRenderer", "rest_framework.parsers.JSONParser")
+)
+MSGPACK_RENDERERS, MSGPACK_PARSERS = (
+    (
+        ["communotes.renderers.MessagePackRenderer"],
+        ["communotes.parsers.MessagePackParser"],
+    )
+    if find_spec("msgpack")
+    else ([], [])
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "communotes.custom_pagination.CustomPageNumberPagination",
     "PAGE_SIZE": 10,
@@ -95,9 +139,20 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": (
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.OrderingFilter",
-        "rest_framework.filters.SearchFilter",
+        "formulas.custom_filters.TrigramSearchFilter",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        JSON_RENDERER,
+        *MSGPACK_RENDERERS,
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        JSON_PARSER,
+        *MSGPACK_PARSERS,
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 DJOSER = {
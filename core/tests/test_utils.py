@@ -3,7 +3,10 @@ import random
 from urllib.parse import urlencode
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -14,6 +17,8 @@ from formulas.data_factories import UserFactory
 class TestApiBase:
     def init(self):
 
+        # responses cached by other tests refer to rolled back data
+        cache.clear()
         self.client = APIClient()
         self.json_response = {}
         self.print_output = True
@@ -94,6 +99,42 @@ class TestApiBase:
 
         return is_subset(subsetdict, supersetdict)
 
+    def capture_queries(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+        return context.captured_queries
+
+    def assert_query_budget(self, send_request, grow_data, max_queries=None):
+        """
+        Send a request, grow the data with grow_data and send the request again,
+        both requests must run the same number of queries, in other words
+        the number of queries does not depend on the number of items.
+        If max_queries is given, it is the budget of each request
+        """
+        first_queries = self.capture_queries(send_request)
+        grow_data()
+        second_queries = self.capture_queries(send_request)
+
+        def format_queries(queries):
+            return "\n".join(query["sql"] for query in queries)
+
+        assert len(first_queries) == len(
+            second_queries
+        ), "The number of queries grew from %d to %d:\n%s" % (
+            len(first_queries),
+            len(second_queries),
+            format_queries(second_queries),
+        )
+        if max_queries is not None:
+            assert (
+                len(second_queries) <= max_queries
+            ), "%d queries exceed the budget of %d:\n%s" % (
+                len(second_queries),
+                max_queries,
+                format_queries(second_queries),
+            )
+        return len(second_queries)
+
 
 ADMIN_DATA = {
     "username": "admin_dp",
@@ -0,0 +1,43 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "BACKGROUND_WORKERS", 2),
+                thread_name_prefix="communotes-background",
+            )
+    return _executor
+
+
+def run_task(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        # the connections of this worker thread
+        connections.close_all()
+
+
+def schedule(func, *args):
+    """
+    Run func(*args) in the worker pool once the current transaction commits,
+    with BACKGROUND_TASKS_SYNC the task runs right away in the caller thread
+    """
+    if getattr(settings, "BACKGROUND_TASKS_SYNC", False):
+        func(*args)
+        return
+    transaction.on_commit(lambda: get_executor().submit(run_task, func, *args))
@@ -0,0 +1,60 @@
+from django.db import connections
+
+from formulas import cache_versions
+
+
+def insert_missing_slugs(model, slug_field, values):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING, only the rows inserted by this
+    query are returned, the values inserted concurrently by other transactions
+    are skipped without an IntegrityError. The model must not have other
+    required columns
+    """
+    connection = connections[model.objects.db]
+    quote_name = connection.ops.quote_name
+    column = quote_name(model._meta.get_field(slug_field).column)
+    sql = (
+        "INSERT INTO {table} ({column}) SELECT unnest(%s::text[]) "
+        "ON CONFLICT ({column}) DO NOTHING RETURNING {pk}, {column}"
+    ).format(
+        table=quote_name(model._meta.db_table),
+        column=column,
+        pk=quote_name(model._meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        # concurrent inserts lock the unique index in the same order, a set
+        # has a different order in each process and they could deadlock
+        cursor.execute(sql, [sorted(values)])
+        return cursor.fetchall()
+
+
+def get_or_create_by_slugs(model, values, slug_field="name"):
+    """
+    Return a dict slug -> instance of the unique slug_field values, the usual
+    cost is a SELECT for the existing values and one INSERT for the missing ones
+    """
+    values = {str(value) for value in values}
+    if not values:
+        return {}
+
+    lookup = "{0}__in".format(slug_field)
+    instances = {
+        getattr(instance, slug_field): instance
+        for instance in model.objects.filter(**{lookup: values})
+    }
+    missing_values = values.difference(instances)
+    if not missing_values:
+        return instances
+
+    field_names = [model._meta.pk.attname, slug_field]
+    for row in insert_missing_slugs(model, slug_field, missing_values):
+        instances[row[1]] = model.from_db(model.objects.db, field_names, row)
+    # other transactions inserted them after the SELECT
+    missing_values = values.difference(instances)
+    if missing_values:
+        for instance in model.objects.filter(**{lookup: missing_values}):
+            instances[getattr(instance, slug_field)] = instance
+
+    # raw inserts do not send post_save
+    cache_versions.bump_version_on_commit(model._meta.model_name)
+    return instances
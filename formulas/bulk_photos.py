@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models import Q
+
+from formulas import bulk_lookups, cache_versions, search_documents, suggestions
+from formulas.models import Photo, PhotoClassification, PhotoContext, Subject, Tag
+
+
+def get_or_create_classifications(keys):
+    """
+    Return a dict (subject_id, exam_number) -> PhotoClassification
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    def select(keys):
+        condition = Q()
+        for subject_id, exam_number in keys:
+            condition |= Q(subject_id=subject_id, exam_number=exam_number)
+        return PhotoClassification.objects.filter(condition)
+
+    classifications = {
+        (classification.subject_id, classification.exam_number): classification
+        for classification in select(keys)
+    }
+    missing_keys = keys.difference(classifications)
+    if missing_keys:
+        # concurrent uploads lock the unique index in the same order, they
+        # can't deadlock
+        PhotoClassification.objects.bulk_create(
+            [
+                PhotoClassification(subject_id=subject_id, exam_number=exam_number)
+                for subject_id, exam_number in sorted(missing_keys)
+            ],
+            ignore_conflicts=True,
+        )
+        for classification in select(missing_keys):
+            key = (classification.subject_id, classification.exam_number)
+            classifications[key] = classification
+        cache_versions.bump_version_on_commit(PhotoClassification._meta.model_name)
+    return classifications
+
+
+def create_photos(items):
+    """
+    Create the photos of validated PhotoBulkItemSerializer items in one
+    transaction, the number of queries doesn't depend on the number of items
+    """
+    with transaction.atomic():
+        subjects = bulk_lookups.get_or_create_by_slugs(
+            Subject,
+            (item["photo_classification"]["subject"] for item in items),
+        )
+
+        def get_classification_key(item):
+            classification_data = item["photo_classification"]
+            subject = subjects[classification_data["subject"]]
+            return subject.pk, classification_data["exam_number"]
+
+        classifications = get_or_create_classifications(
+            get_classification_key(item) for item in items
+        )
+        tags = bulk_lookups.get_or_create_by_slugs(
+            Tag, (name for item in items for name in item.get("tags", []))
+        )
+
+        contexts = [
+            PhotoContext(**item["photo_context"])
+            for item in items
+            if "photo_context" in item
+        ]
+        PhotoContext.objects.bulk_create(contexts)
+        contexts = iter(contexts)
+
+        photos = []
+        for item in items:
+            photo = Photo(
+                name=item["name"],
+                description=item.get("description", ""),
+                file=item.get("file"),
+                photo_classification=classifications[get_classification_key(item)],
+                photo_context=next(contexts) if "photo_context" in item else None,
+                user=item["user"],
+            )
+            photo.copy_classification()
+            photo.tag_ids = sorted({tags[name].pk for name in item.get("tags", [])})
+            photos.append(photo)
+        Photo.objects.bulk_create(photos)
+
+        PhotoTag = Photo.tags.through
+        PhotoTag.objects.bulk_create(
+            [
+                PhotoTag(photo_id=photo.pk, tag_id=tags[name].pk)
+                for photo, item in zip(photos, items)
+                for name in set(item.get("tags", []))
+            ]
+        )
+
+        # bulk_create and the raw inserts don't send signals
+        search_documents.refresh_search_vectors(
+            Photo.objects.filter(pk__in=[photo.pk for photo in photos])
+        )
+        cache_versions.bump_version_on_commit(Photo._meta.model_name)
+        suggestions.bump_suggestions_version()
+
+    return photos
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY_PREFIX = "formulas:version:"
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def get_versions(names):
+    """
+    Return the current version of each name, the first version is the current
+    time so a version key evicted from a shared cache never goes back to
+    a version that was already used
+    """
+    cache = get_cache()
+    keys = [VERSION_KEY_PREFIX + name for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(name):
+    key = VERSION_KEY_PREFIX + name
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the key does not exist yet
+        get_versions([name])
+
+
+def bump_version_on_commit(name):
+    """
+    Bump now so the current transaction reads fresh data and bump again on
+    commit, other requests could have cached the data before the commit
+    """
+    bump_version(name)
+    transaction.on_commit(lambda: bump_version(name))
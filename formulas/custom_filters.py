@@ -1,17 +1,104 @@
-from django_filters import AllValuesFilter, FilterSet
-from django_filters.filters import AllValuesMultipleFilter
+from django import forms
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Subquery
+from django.db.models.functions import Greatest
+from django.utils.encoding import force_str
+from django.utils.translation import gettext_lazy as _
+from django_filters import CharFilter, FilterSet, TypedChoiceFilter
+from django_filters.constants import EMPTY_VALUES
+from django_filters.filters import Filter, MultipleChoiceFilter
+from rest_framework.filters import SearchFilter
 
-from formulas.models import Photo, PhotoClassification, Review
+from formulas.models import Photo, PhotoClassification, Review, Subject, Tag
+
+# none of these filters builds its choices from the database, values are
+# validated by type and looked up through indexed columns
+
+EXAM_NUMBER_CHOICES = [(number, number) for number in range(1, 7)]
+
+
+class PositiveIntegerFilter(Filter):
+    field_class = forms.IntegerField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("min_value", 1)
+        super().__init__(*args, **kwargs)
+
+
+class AnyValueMultipleChoiceField(forms.MultipleChoiceField):
+    def valid_value(self, value):
+        return True
+
+
+class NameArrayFilter(MultipleChoiceFilter):
+    """
+    Resolve the names to pks with a single query on the unique name index,
+    then filter an array of pks by them, the array contains all of them when
+    conjoined or any of them otherwise, a single GIN index probe
+    """
+
+    field_class = AnyValueMultipleChoiceField
+
+    def __init__(self, *args, name_model=None, name_field="name", **kwargs):
+        # the filterset overrides self.model with its own model
+        self.name_model = name_model
+        self.name_field = name_field
+        super().__init__(*args, **kwargs)
+
+    def get_pks(self, names):
+        return list(
+            self.name_model.objects.filter(
+                **{"{0}__in".format(self.name_field): names}
+            ).values_list("pk", flat=True)
+        )
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+
+        names = set(value)
+        pks = self.get_pks(names)
+
+        if self.conjoined:
+            if len(pks) < len(names):
+                return qs.none()
+            lookup_expr = "contains"
+        else:
+            if not pks:
+                return qs.none()
+            lookup_expr = "overlap"
+        return self.get_method(qs)(
+            **{"{0}__{1}".format(self.field_name, lookup_expr): pks}
+        )
+
+
+class NameFilter(CharFilter):
+    """
+    Filter the relation by the pk of the name, a scalar subquery on the unique
+    name index that runs once, the filtered table needs no join
+    """
+
+    def __init__(self, *args, name_model=None, name_field="name", **kwargs):
+        self.name_model = name_model
+        self.name_field = name_field
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        pk = self.name_model.objects.filter(**{self.name_field: value}).values("pk")
+        return self.get_method(qs)(**{self.field_name: Subquery(pk)})
 
 
 class PhotoClassificationFilter(FilterSet):
 
-    subject = AllValuesFilter(
+    subject = CharFilter(
         field_name="subject__name",
     )
 
-    exam_number = AllValuesFilter(
-        field_name="exam_number",
+    exam_number = TypedChoiceFilter(
+        field_name="exam_number", choices=EXAM_NUMBER_CHOICES, coerce=int
     )
 
     class Meta:
@@ -24,33 +111,96 @@ class PhotoClassificationFilter(FilterSet):
 
 class PhotoFilter(FilterSet):
 
-    subject = AllValuesFilter(
-        field_name="photo_classification__subject__name",
-    )
+    subject = NameFilter(field_name="subject", name_model=Subject)
 
-    exam_number = AllValuesFilter(
-        field_name="photo_classification__exam_number",
+    exam_number = TypedChoiceFilter(
+        field_name="exam_number", choices=EXAM_NUMBER_CHOICES, coerce=int
     )
 
-    photo_classification = AllValuesFilter(field_name="photo_classification__pk")
+    photo_classification = PositiveIntegerFilter(field_name="photo_classification")
 
-    tag = AllValuesMultipleFilter(field_name="tags__name", conjoined=True)
+    tag = NameArrayFilter(field_name="tag_ids", name_model=Tag, conjoined=True)
 
-    user = AllValuesFilter(
-        field_name="user__pk",
+    tag_any = NameArrayFilter(field_name="tag_ids", name_model=Tag)
+
+    user = PositiveIntegerFilter(
+        field_name="user",
     )
 
     class Meta:
         model = Photo
-        fields = ("subject", "exam_number", "photo_classification", "tag", "user")
+        fields = (
+            "subject",
+            "exam_number",
+            "photo_classification",
+            "tag",
+            "tag_any",
+            "user",
+        )
 
 
 class ReviewFilter(FilterSet):
 
-    photo = AllValuesFilter(
-        field_name="photo__pk",
+    photo = PositiveIntegerFilter(
+        field_name="photo",
     )
 
     class Meta:
         model = Review
         fields = ("photo",)
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Case insensitive substring search, the UPPER(field) LIKE '%term%' lookups
+    are served by the pg_trgm GIN indexes of the search fields.
+    With ?rank=similarity results are ordered by their trigram similarity
+    """
+
+    rank_param = "rank"
+    rank_value = "similarity"
+    rank_description = _("Use 'similarity' to order the results by relevance.")
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        queryset = super().filter_queryset(request, queryset, view)
+
+        ranked = request.query_params.get(self.rank_param) == self.rank_value
+        if not ranked or not search_fields or not search_terms:
+            return queryset
+
+        search_text = " ".join(search_terms)
+        similarities = [
+            TrigramSimilarity(self.get_field_name(search_field), search_text)
+            for search_field in search_fields
+        ]
+        if len(similarities) > 1:
+            similarity = Greatest(*similarities)
+        else:
+            similarity = similarities[0]
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.annotate(search_similarity=similarity).order_by(
+            "-search_similarity", *ordering
+        )
+
+    def get_field_name(self, search_field):
+        search_field = str(search_field)
+        if search_field[0] in self.lookup_prefixes:
+            return search_field[1:]
+        return search_field
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if getattr(view, "search_fields", None):
+            parameters.append(
+                {
+                    "name": self.rank_param,
+                    "required": False,
+                    "in": "query",
+                    "description": force_str(self.rank_description),
+                    "schema": {"type": "string", "enum": [self.rank_value]},
+                }
+            )
+        return parameters
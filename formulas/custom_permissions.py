@@ -6,4 +6,4 @@ class IsCurrentUserOwnerOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         else:
-            return obj.user == request.user
+            return obj.user_id == request.user.pk
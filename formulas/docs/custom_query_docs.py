@@ -1,6 +1,8 @@
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 
+from formulas.docs.photo_docs import my_review_param
+
 subject_param = OpenApiParameter(
     name="subject",
     description="slug regex pattern [-a-zA-Z0-9_],",
@@ -15,10 +17,85 @@ exam_number_param = OpenApiParameter(
     location=OpenApiParameter.PATH,
 )
 
+search_param = OpenApiParameter(
+    name="search",
+    description=(
+        "Full text search over the name, tags, description, professor and "
+        "subject, in that order of weight. All the words must match, "
+        '"quoted words" match a phrase, `or` matches either side, '
+        "-word excludes a word and word* matches the words that start with it"
+    ),
+    type=OpenApiTypes.STR,
+)
+
+ordering_param = OpenApiParameter(
+    name="ordering",
+    description=(
+        "Use 'relevance' together with search to order the results by relevance, "
+        "each result includes its rank and a html headline of the description, "
+        "the whole text is html-escaped and the matched words are wrapped in "
+        "<mark></mark>, the only raw html of the headline"
+    ),
+    type=OpenApiTypes.STR,
+    enum=["relevance"],
+)
+
 custom_schema = extend_schema(
     parameters=[
         subject_param,
         exam_number_param,
+        search_param,
+        ordering_param,
+        my_review_param,
     ],
     description="",
 )
+
+leaderboard_schema = extend_schema(
+    parameters=[
+        subject_param,
+        exam_number_param,
+    ],
+    description=(
+        "Best reviewed photos of a subject, or of an exam of the subject, "
+        "the leaderboards are refreshed shortly after the reviews change"
+    ),
+)
+
+facets_schema = extend_schema(
+    parameters=[
+        subject_param,
+        search_param,
+    ],
+    description=(
+        "Number of photos of the subject, matching the search term, by tag, "
+        "exam number and formula type, the values are ordered by count"
+    ),
+)
+
+suggest_schema = extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name="q",
+            description="Prefix of the names, case insensitive",
+            type=OpenApiTypes.STR,
+            required=True,
+        ),
+        OpenApiParameter(
+            name="kind",
+            description="Only suggest names of this kind, all the kinds by default",
+            type=OpenApiTypes.STR,
+            enum=["tag", "subject", "professor"],
+        ),
+        OpenApiParameter(
+            name="limit",
+            description="Suggestions per kind, from 1 to 50, 10 by default",
+            type=OpenApiTypes.INT,
+        ),
+    ],
+    description=(
+        "Autocomplete tag, subject and professor names, the names that start "
+        "with the prefix are ordered by the number of photos that use them. "
+        "New names and usages may take some seconds to appear"
+    ),
+)
@@ -127,6 +127,7 @@ class CustomSchemaHelper:
 
     def get_retrieve_schema(self):
         return extend_schema(
+            parameters=self.get_custom_retrieve_parameters(),
             description=self.get_retrieve_description(),
             examples=[
                 self.get_successful_detail_example(),
@@ -134,6 +135,9 @@ class CustomSchemaHelper:
             ],
         )
 
+    def get_custom_retrieve_parameters(self):
+        return []
+
     def get_retrieve_description(self):
         detail_item_name = getattr(self, "detail_item_name", "No Name")
         return self.retrieve_description_template.format(detail_item_name)
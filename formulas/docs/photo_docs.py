@@ -1,11 +1,15 @@
 import textwrap
 
 from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import OpenApiParameter
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 
 from formulas.data_factories import PhotoFactory
 from formulas.docs.docs_utils import CustomSchemaHelper
-from formulas.serializers import PhotoSerializer
+from formulas.serializers import (
+    MAX_BULK_PHOTOS,
+    PhotoBulkItemSerializer,
+    PhotoSerializer,
+)
 
 p1 = OpenApiParameter(
     name="photo_classification",
@@ -18,6 +22,17 @@ p2 = OpenApiParameter(
 )
 p3 = OpenApiParameter(name="tag", description="Tag name", type=OpenApiTypes.STR)
 p4 = OpenApiParameter(name="user", description="User pk", type=OpenApiTypes.INT)
+p5 = OpenApiParameter(
+    name="tag_any", description="Tag name, any of them", type=OpenApiTypes.STR
+)
+my_review_param = OpenApiParameter(
+    name="my_review",
+    description=(
+        "Use true to include `review_count` and `my_review`, the pk and stars "
+        "of your review of each photo or null"
+    ),
+    type=OpenApiTypes.BOOL,
+)
 
 
 class CustomPhotoSchema(CustomSchemaHelper):
@@ -41,6 +56,7 @@ class CustomPhotoSchema(CustomSchemaHelper):
         description = f"""
         {super().get_create_description()} <br><br>
         * images are uploaded by a patch method
+        * `thumbnail` (320x320) and `preview` (at most 1280x1280) are WebP versions of the image, they are generated after the upload and are null until they are ready
         * photo classification, photo context and tags works by `get_or_create` functionality, in other words, if they don't exit there will be created
         """
         return textwrap.dedent(description)
@@ -51,6 +67,8 @@ class CustomPhotoSchema(CustomSchemaHelper):
         * filter by multiple tags repeating the query param. ex: `tag=value1&tag=value2`
 
         * tags filtering is conjoined, in other wors use SQL AND
+
+        * `tag_any` filters the photos with any of the tags, ex: `tag_any=value1&tag_any=value2`
         """
         return textwrap.dedent(description)
 
@@ -81,7 +99,23 @@ class CustomPhotoSchema(CustomSchemaHelper):
         data["updated_at"] = "2021-07-07T16:18:29.206357Z"
 
     def get_custom_list_parameters(self):
-        return [p1, p2, p3, p4]
+        return [p1, p2, p3, p4, p5, my_review_param]
+
+    def get_custom_retrieve_parameters(self):
+        return [my_review_param]
 
 
 custom_schema = CustomPhotoSchema()
+
+bulk_create_schema = extend_schema(
+    request=PhotoBulkItemSerializer(many=True),
+    responses={201: PhotoSerializer(many=True)},
+    description=textwrap.dedent(
+        f"""
+        Create up to {MAX_BULK_PHOTOS} photos in a single request, either all the photos are created or none <br><br>
+        * send a JSON list of photos, or a multipart form where the `photos` field is the JSON list and `file_0`, `file_1`, ... are the images of the photos at those positions
+        * photo classification, photo context and tags works by `get_or_create` functionality, like in the photo creation
+        * errors are reported per photo, a list with the errors of each photo in the same order, valid photos have no errors
+        """
+    ),
+)
@@ -1,9 +1,15 @@
+import textwrap
+
 from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import OpenApiExample, OpenApiParameter
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
 
 from formulas.data_factories import ReviewFactory
 from formulas.docs.docs_utils import CustomSchemaHelper
-from formulas.serializers import ReviewSerializer
+from formulas.serializers import (
+    MAX_BULK_REVIEWS,
+    ReviewSerializer,
+    ReviewUpsertSerializer,
+)
 
 owner_review_error_examples = OpenApiExample(
     name="owner review response",
@@ -53,3 +59,17 @@ class CustomReviewSchema(CustomSchemaHelper):
 
 
 custom_schema = CustomReviewSchema()
+
+upsert_schema = extend_schema(
+    request=ReviewUpsertSerializer,
+    responses={200: ReviewUpsertSerializer, 201: ReviewUpsertSerializer},
+    description=textwrap.dedent(
+        f"""
+        Set your stars for a photo, the review is created or its stars are replaced, repeating the request has no further effect <br><br>
+        * `created` tells if the review was created by this request, then the status is 201
+        * send a list of up to {MAX_BULK_REVIEWS} reviews, one per photo, to set them at once, either all of them are saved or none
+        * errors of a list are reported per review, in the same order, valid reviews have no errors
+        """
+    ),
+    examples=[owner_review_error_examples],
+)
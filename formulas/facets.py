@@ -0,0 +1,73 @@
+from django.db import connection
+
+from formulas.models import Photo, PhotoContext, Tag
+
+# facet name, same as the filter of PhotoList, and its column
+FACET_COLUMNS = (
+    ("tag", "t.name"),
+    ("exam_number", "p.exam_number"),
+    ("formula_type", "ctx.formula_type"),
+)
+
+
+def get_grouping_ids():
+    """
+    Map the GROUPING(...) value of each facet to its index in FACET_COLUMNS,
+    the bit of every column that is not grouped is set and the first column
+    is the most significant bit, the total has all the bits set
+    """
+    all_bits = (1 << len(FACET_COLUMNS)) - 1
+    grouping_ids = {
+        all_bits ^ (1 << (len(FACET_COLUMNS) - 1 - index)): index
+        for index in range(len(FACET_COLUMNS))
+    }
+    return grouping_ids, all_bits
+
+
+def get_facets_sql(photos_sql):
+    columns = ", ".join(column for _, column in FACET_COLUMNS)
+    grouping_sets = ", ".join("({0})".format(column) for _, column in FACET_COLUMNS)
+    # the tags join repeats the photos, COUNT(DISTINCT) counts each one once
+    return """
+        SELECT GROUPING({columns}), {columns}, COUNT(DISTINCT p.id)
+        FROM {photo_table} p
+        LEFT JOIN {context_table} ctx ON ctx.id = p.photo_context_id
+        LEFT JOIN {photo_tag_table} pt ON pt.photo_id = p.id
+        LEFT JOIN {tag_table} t ON t.id = pt.tag_id
+        WHERE p.id IN ({photos})
+        GROUP BY GROUPING SETS ({grouping_sets}, ())
+    """.format(
+        columns=columns,
+        grouping_sets=grouping_sets,
+        photo_table=Photo._meta.db_table,
+        context_table=PhotoContext._meta.db_table,
+        photo_tag_table=Photo.tags.through._meta.db_table,
+        tag_table=Tag._meta.db_table,
+        photos=photos_sql,
+    )
+
+
+def get_facets(photos):
+    """
+    Count the photos of the queryset by tag, exam number and formula type,
+    plus the total, with a single GROUPING SETS query.
+    Photos without a value are only counted in the total
+    """
+    photos_sql, params = photos.order_by().values("pk").query.sql_with_params()
+    grouping_ids, total_grouping_id = get_grouping_ids()
+
+    facets = {"count": 0, **{name: [] for name, _ in FACET_COLUMNS}}
+    with connection.cursor() as cursor:
+        cursor.execute(get_facets_sql(photos_sql), params)
+        for grouping_id, *values, count in cursor.fetchall():
+            if grouping_id == total_grouping_id:
+                facets["count"] = count
+                continue
+            index = grouping_ids[grouping_id]
+            name, value = FACET_COLUMNS[index][0], values[index]
+            if value not in (None, ""):
+                facets[name].append({"value": value, "count": count})
+
+    for name, _ in FACET_COLUMNS:
+        facets[name].sort(key=lambda item: (-item["count"], item["value"]))
+    return facets
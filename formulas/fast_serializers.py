@@ -0,0 +1,127 @@
+from collections import defaultdict
+
+from django.db.models.query import QuerySet
+from rest_framework.fields import DateTimeField
+
+from formulas.models import Photo
+
+# the ordering fields are included for the keyset pagination positions
+PHOTO_ROW_FIELDS = (
+    "id",
+    "name",
+    "file",
+    "thumbnail",
+    "preview",
+    "description",
+    "photo_classification_id",
+    "photo_classification__subject__name",
+    "photo_classification__exam_number",
+    "photo_context_id",
+    "photo_context__formula_type",
+    "photo_context__professor",
+    "user_id",
+    "total_reviews",
+    "review_count",
+    "created_at",
+    "updated_at",
+)
+
+IMAGE_FIELDS = ("file", "thumbnail", "preview")
+
+
+def get_photo_rows(queryset):
+    """
+    The photos of the queryset as values() rows, the related objects
+    are columns of the same query
+    """
+    return queryset.prefetch_related(None).values(*PHOTO_ROW_FIELDS)
+
+
+def get_photo_tags(photo_pks):
+    """
+    Map each photo pk to its tag names, ordered like the tags of with_related()
+    """
+    PhotoTag = Photo.tags.through
+    photo_tags = defaultdict(list)
+    rows = (
+        PhotoTag.objects.filter(photo_id__in=photo_pks)
+        .order_by("tag_id")
+        .values_list("photo_id", "tag__name")
+    )
+    for photo_pk, tag_name in rows:
+        photo_tags[photo_pk].append(tag_name)
+    return photo_tags
+
+
+class PhotoRowSerializer:
+    """
+    Read only replacement of PhotoSerializer, renders the same data from
+    values() rows without building model instances nor running the fields
+    of the serializer for each photo
+    """
+
+    datetime_field = DateTimeField()
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        if isinstance(instance, QuerySet):
+            instance = get_photo_rows(instance)
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @property
+    def data(self):
+        if not hasattr(self, "_data"):
+            self._data = self.to_representation()
+        return self._data
+
+    def to_representation(self):
+        rows = list(self.instance) if self.many else [self.instance]
+        photo_tags = get_photo_tags([row["id"] for row in rows])
+        request = self.context.get("request")
+        storages = {name: Photo._meta.get_field(name).storage for name in IMAGE_FIELDS}
+
+        def to_url(name, file_name):
+            # same as ImageField.to_representation with use_url
+            if not file_name:
+                return None
+            url = storages[name].url(file_name)
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+
+        to_datetime = self.datetime_field.to_representation
+        my_reviews = self.context.get("my_reviews")
+        data = [
+            {
+                "pk": row["id"],
+                "name": row["name"],
+                "file": to_url("file", row["file"]),
+                "thumbnail": to_url("thumbnail", row["thumbnail"]),
+                "preview": to_url("preview", row["preview"]),
+                "description": row["description"],
+                "photo_classification": {
+                    "pk": row["photo_classification_id"],
+                    "subject": row["photo_classification__subject__name"],
+                    "exam_number": row["photo_classification__exam_number"],
+                },
+                "photo_context": None
+                if row["photo_context_id"] is None
+                else {
+                    "pk": row["photo_context_id"],
+                    "formula_type": row["photo_context__formula_type"],
+                    "professor": row["photo_context__professor"],
+                },
+                "user": row["user_id"],
+                "tags": photo_tags.get(row["id"], []),
+                "created_at": to_datetime(row["created_at"]),
+                "updated_at": to_datetime(row["updated_at"]),
+            }
+            for row in rows
+        ]
+        # the optional fields of PhotoSerializer
+        if my_reviews is not None:
+            for row, item in zip(rows, data):
+                item["review_count"] = row["review_count"]
+                item["my_review"] = my_reviews.get(row["id"])
+        return data if self.many else data[0]
@@ -0,0 +1,73 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from formulas import background, storage_deletions
+from formulas.models import Photo
+
+# the thumbnail is cropped to its size, the preview keeps the aspect ratio
+THUMBNAIL_SIZE = (320, 320)
+PREVIEW_SIZE = (1280, 1280)
+WEBP_QUALITY = 80
+
+VARIANT_FIELDS = ("thumbnail", "preview")
+
+
+def encode_webp(image):
+    stream = BytesIO()
+    image.save(stream, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return ContentFile(stream.getvalue())
+
+
+def build_variants(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    thumbnail = ImageOps.fit(image, THUMBNAIL_SIZE, method=Image.LANCZOS)
+    preview = image.copy()
+    preview.thumbnail(PREVIEW_SIZE, Image.LANCZOS)
+    return {"thumbnail": encode_webp(thumbnail), "preview": encode_webp(preview)}
+
+
+def get_variant_names(photo):
+    return [getattr(photo, field_name).name for field_name in VARIANT_FIELDS]
+
+
+def create_photo_variants(photo_pk):
+    """
+    Store the WebP variants of the photo file and record them on the photo,
+    if the file changed meanwhile the variants are discarded
+    """
+    photo = Photo.objects.filter(pk=photo_pk).first()
+    if photo is None or not photo.file:
+        return
+
+    file_name = photo.file.name
+    with photo.file.open("rb") as image_file:
+        with Image.open(image_file) as image:
+            variants = build_variants(image)
+
+    old_variant_names = get_variant_names(photo)
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    for field_name, content in variants.items():
+        variant_name = "{0}_{1}.webp".format(stem, field_name)
+        getattr(photo, field_name).save(variant_name, content, save=False)
+
+    updated = Photo.objects.filter(pk=photo.pk, file=file_name).update(
+        thumbnail=photo.thumbnail.name,
+        preview=photo.preview.name,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # the file changed, nothing references these variants
+        old_variant_names = get_variant_names(photo)
+    storage_deletions.enqueue_deletion(*old_variant_names)
+
+
+def schedule_photo_variants(photo):
+    if photo.file:
+        background.schedule(create_photo_variants, photo.pk)
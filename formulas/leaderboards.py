@@ -0,0 +1,131 @@
+from django.db import connection, transaction
+
+from formulas import background
+from formulas.models import PHOTO_RANKING_ORDERING, LeaderboardEntry, Photo, Subject
+
+LEADERBOARD_SIZE = 10
+
+
+def get_ranking_order_sql():
+    columns = []
+    for field_name in PHOTO_RANKING_ORDERING:
+        descending = field_name.startswith("-")
+        column = Photo._meta.get_field(field_name.lstrip("-")).column
+        columns.append(
+            "p.{0} {1}".format(
+                connection.ops.quote_name(column), "DESC" if descending else "ASC"
+            )
+        )
+    return ", ".join(columns)
+
+
+def get_ranked_photos_sql(exam_number_sql, partition_sql, where_sql):
+    return """
+        SELECT subject_id, exam_number, position, photo_id, score FROM (
+            SELECT p.subject_id, {exam_number} AS exam_number,
+            ROW_NUMBER() OVER (
+                PARTITION BY {partition} ORDER BY {ordering}
+            ) AS position,
+            p.id AS photo_id, p.total_reviews AS score
+            FROM {photo_table} p
+            {where}
+        ) AS ranked WHERE position <= %s
+    """.format(
+        exam_number=exam_number_sql,
+        partition=partition_sql,
+        ordering=get_ranking_order_sql(),
+        photo_table=Photo._meta.db_table,
+        where=where_sql,
+    )
+
+
+def refresh_leaderboards(subject_ids=None):
+    """
+    Rebuild the leaderboards of the given subjects, or all of them, with a
+    DELETE and an INSERT ... SELECT ranked by PHOTO_RANKING_ORDERING
+    """
+    table = LeaderboardEntry._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        if subject_ids is None:
+            # concurrent refreshes would insert the same positions twice
+            cursor.execute("LOCK TABLE {0} IN SHARE ROW EXCLUSIVE MODE".format(table))
+            where_sql, delete_where_sql, subject_params = "", "", []
+        else:
+            subject_ids = sorted(set(subject_ids))
+            if not subject_ids:
+                return
+            list(
+                Subject.objects.select_for_update()
+                .filter(pk__in=subject_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            where_sql = "WHERE p.subject_id = ANY(%s)"
+            delete_where_sql = "WHERE subject_id = ANY(%s)"
+            subject_params = [subject_ids]
+
+        cursor.execute(
+            "DELETE FROM {0} {1}".format(table, delete_where_sql), subject_params
+        )
+        cursor.execute(
+            """
+            INSERT INTO {table} (subject_id, exam_number, position, photo_id, score)
+            {exam_leaderboards} UNION ALL {subject_leaderboards}
+            """.format(
+                table=table,
+                exam_leaderboards=get_ranked_photos_sql(
+                    "p.exam_number", "p.subject_id, p.exam_number", where_sql
+                ),
+                subject_leaderboards=get_ranked_photos_sql(
+                    "NULL::integer", "p.subject_id", where_sql
+                ),
+            ),
+            [*subject_params, LEADERBOARD_SIZE, *subject_params, LEADERBOARD_SIZE],
+        )
+
+
+def needs_refresh(photo_id):
+    """
+    Return the subject id of the photo if its score can change its exam
+    leaderboard, a photo out of the exam leaderboard is out of the subject one
+    """
+    photo = (
+        Photo.objects.filter(pk=photo_id)
+        .values("total_reviews", "subject_id", "exam_number")
+        .first()
+    )
+    if photo is None:
+        return None
+
+    subject_id = photo["subject_id"]
+    scores = dict(
+        LeaderboardEntry.objects.filter(
+            subject_id=subject_id,
+            exam_number=photo["exam_number"],
+        ).values_list("photo_id", "score")
+    )
+    if (
+        photo_id in scores
+        or len(scores) < LEADERBOARD_SIZE
+        or photo["total_reviews"] >= min(scores.values())
+    ):
+        return subject_id
+    return None
+
+
+def refresh_photo_leaderboards(photo_id):
+    subject_id = needs_refresh(photo_id)
+    if subject_id is not None:
+        refresh_leaderboards([subject_id])
+
+
+def schedule_photo_refresh(photo_id):
+    """
+    Refresh the leaderboards of the photo after its score changed,
+    in the background so reviews don't wait for the ranking queries
+    """
+    background.schedule(refresh_photo_leaderboards, photo_id)
+
+
+def schedule_subjects_refresh(subject_ids):
+    background.schedule(refresh_leaderboards, set(subject_ids))
@@ -0,0 +1,87 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from formulas.fast_serializers import PhotoRowSerializer
+from formulas.models import Photo, PhotoClassification, PhotoContext, Subject, Tag
+from formulas.serializers import PhotoSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the time to read and render a page of photos with "
+        "PhotoSerializer and PhotoRowSerializer, all the generated data "
+        "is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--tags", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_photos(options["page_size"], options["tags"])
+            queryset = Photo.objects.with_related().ranked()[: options["page_size"]]
+            request = Request(APIRequestFactory().get("/", HTTP_HOST="localhost"))
+
+            for serializer_class in (PhotoSerializer, PhotoRowSerializer):
+                elapsed = self.time_serializer(
+                    serializer_class, queryset, request, options["repeat"]
+                )
+                self.stdout.write(
+                    "{0}: {1:.2f} ms per page".format(
+                        serializer_class.__name__, elapsed
+                    )
+                )
+
+            transaction.set_rollback(True)
+
+    def create_photos(self, rows, tags_per_photo):
+        user = get_user_model().objects.create(username="benchmark_serializer_user")
+        subject = Subject.objects.get_or_create(name="benchmark-serializer")[0]
+        photo_classification = PhotoClassification.objects.get_or_create(
+            subject=subject, exam_number=1
+        )[0]
+        tags = Tag.objects.bulk_create(
+            Tag(name="benchmark-serializer-{0}".format(number))
+            for number in range(tags_per_photo)
+        )
+        contexts = PhotoContext.objects.bulk_create(
+            PhotoContext(professor="professor", formula_type="F1") for _ in range(rows)
+        )
+        photos = Photo.objects.bulk_create(
+            Photo(
+                name="photo {0}".format(number),
+                description="description of the photo {0}".format(number),
+                file="benchmark/photo_{0}.png".format(number),
+                photo_classification=photo_classification,
+                subject=subject,
+                exam_number=photo_classification.exam_number,
+                photo_context=photo_context,
+                user=user,
+                # first in the ranking ordering
+                total_reviews=1000000,
+            )
+            for number, photo_context in enumerate(contexts)
+        )
+        PhotoTag = Photo.tags.through
+        PhotoTag.objects.bulk_create(
+            PhotoTag(photo_id=photo.pk, tag_id=tag.pk)
+            for photo in photos
+            for tag in tags
+        )
+
+    def time_serializer(self, serializer_class, queryset, request, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            serializer = serializer_class(
+                queryset.all(), many=True, context={"request": request}
+            )
+            JSONRenderer().render(serializer.data)
+        return (time.perf_counter() - start) * 1000 / repeat
@@ -0,0 +1,102 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from formulas.models import Photo, PhotoClassification, Subject
+
+WORDS = [
+    "integral",
+    "derivative",
+    "limit",
+    "series",
+    "vector",
+    "matrix",
+    "energy",
+    "force",
+    "momentum",
+    "voltage",
+    "current",
+    "entropy",
+    "pressure",
+    "volume",
+    "area",
+    "probability",
+    "variance",
+    "gradient",
+    "divergence",
+    "torque",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the trigram substring search with the old regex search "
+        "on a large photo table, all the generated data is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        # every photo name has a unique code, a selective term by default
+        parser.add_argument("--term", default="n04242")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_photos(options["rows"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE formulas_photo")
+
+            term = options["term"]
+            searches = {
+                "regex": Photo.objects.filter(
+                    Q(name__iregex=term) | Q(description__iregex=term)
+                ),
+                "trigram": Photo.objects.filter(
+                    Q(name__icontains=term) | Q(description__icontains=term)
+                ),
+            }
+            for name, queryset in searches.items():
+                elapsed = self.time_search(
+                    queryset, options["page_size"], options["repeat"]
+                )
+                self.stdout.write(
+                    "{0}: {1:.2f} ms per page (count + page)".format(name, elapsed)
+                )
+                self.stdout.write(queryset.explain())
+
+            transaction.set_rollback(True)
+
+    def create_photos(self, rows):
+        user = get_user_model().objects.create(username="benchmark_search_user")
+        subject = Subject.objects.get_or_create(name="benchmark-search")[0]
+        photo_classification = PhotoClassification.objects.get_or_create(
+            subject=subject, exam_number=1
+        )[0]
+
+        def random_text(size):
+            return " ".join(random.choice(WORDS) for _ in range(size))
+
+        photos = (
+            Photo(
+                name="{0} n{1:06d}".format(random_text(3), number),
+                description=random_text(20),
+                photo_classification=photo_classification,
+                subject=subject,
+                exam_number=photo_classification.exam_number,
+                user=user,
+            )
+            for number in range(rows)
+        )
+        Photo.objects.bulk_create(photos, batch_size=5000)
+
+    def time_search(self, queryset, page_size, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            queryset.count()
+            list(queryset[:page_size])
+        return (time.perf_counter() - start) * 1000 / repeat
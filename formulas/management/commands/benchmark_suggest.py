@@ -0,0 +1,62 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from formulas import suggestions
+from formulas.models import Tag
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency of the tag suggestions with many tags, "
+        "all the generated data is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--queries", type=int, default=1000)
+        parser.add_argument("--limit", type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            names = self.create_tags(options["rows"])
+
+            start = time.perf_counter()
+            index = suggestions.PrefixIndex(suggestions.get_tag_usages(), version=None)
+            self.stdout.write(
+                "index build: {0:.0f} ms".format((time.perf_counter() - start) * 1000)
+            )
+
+            for prefix_length in (1, 2, 3, 5):
+                prefixes = [
+                    random.choice(names)[:prefix_length]
+                    for _ in range(options["queries"])
+                ]
+                latencies = []
+                for prefix in prefixes:
+                    start = time.perf_counter()
+                    index.search(prefix, options["limit"])
+                    latencies.append((time.perf_counter() - start) * 1000)
+                latencies.sort()
+                self.stdout.write(
+                    "prefix length {0}: p50 {1:.3f} ms, p99 {2:.3f} ms".format(
+                        prefix_length,
+                        latencies[len(latencies) // 2],
+                        latencies[int(len(latencies) * 0.99)],
+                    )
+                )
+
+            transaction.set_rollback(True)
+
+    def create_tags(self, rows):
+        names = {
+            "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 12)))
+            for _ in range(rows)
+        }
+        Tag.objects.bulk_create(
+            (Tag(name=name) for name in names), batch_size=5000, ignore_conflicts=True
+        )
+        return list(names)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from formulas import storage_deletions
+
+
+class Command(BaseCommand):
+    help = "Delete the stored files queued for deletion, failed deletions are retried"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=storage_deletions.BATCH_SIZE
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Keep running and drain the queue every given seconds",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted, failed = storage_deletions.drain_deletions(options["batch_size"])
+            self.stdout.write(
+                "Deleted {0} files, {1} failed attempts".format(deleted, failed)
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from formulas import leaderboards
+from formulas.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = "Rebuild the leaderboards of every subject and exam"
+
+    def handle(self, *args, **options):
+        leaderboards.refresh_leaderboards()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt leaderboards, {0} entries".format(
+                    LeaderboardEntry.objects.count()
+                )
+            )
+        )
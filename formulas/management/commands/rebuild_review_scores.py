@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from formulas import review_scores
+from formulas.models import Photo
+
+
+class Command(BaseCommand):
+    help = "Rebuild or check the review score counters stored on each photo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report photos with outdated counters, exit with error if any",
+        )
+        parser.add_argument(
+            "--photo",
+            type=int,
+            action="append",
+            dest="photo_pks",
+            help="Restrict the command to the given photo pk, can be repeated",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Photo.objects.all()
+        if options["photo_pks"]:
+            queryset = queryset.filter(pk__in=options["photo_pks"])
+
+        if options["check"]:
+            outdated = review_scores.find_outdated_scores(queryset)
+            for photo_pk, differences in outdated:
+                details = ", ".join(
+                    "{0}: stored {1} computed {2}".format(field, stored, computed)
+                    for field, (stored, computed) in differences.items()
+                )
+                self.stdout.write("photo {0}: {1}".format(photo_pk, details))
+            if outdated:
+                raise CommandError(
+                    "{0} photos have outdated review scores".format(len(outdated))
+                )
+            self.stdout.write(self.style.SUCCESS("All review scores are up to date"))
+            return
+
+        fixed = review_scores.rebuild_scores(queryset)
+        self.stdout.write(
+            self.style.SUCCESS("Rebuilt review scores of {0} photos".format(fixed))
+        )
@@ -0,0 +1,70 @@
+# Generated by Django 3.0.3 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0012_auto_20210813_2058'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='review_count',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='star_1_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='star_2_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='star_3_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='star_4_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='star_5_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='total_reviews',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunSQL(sql="""
+            UPDATE "formulas_photo" SET
+            "total_reviews" = scores.total_reviews,
+            "review_count" = scores.review_count,
+            "star_1_count" = scores.star_1_count,
+            "star_2_count" = scores.star_2_count,
+            "star_3_count" = scores.star_3_count,
+            "star_4_count" = scores.star_4_count,
+            "star_5_count" = scores.star_5_count
+            FROM (
+                SELECT "photo_id",
+                SUM("stars") AS total_reviews,
+                COUNT(*) AS review_count,
+                COUNT(*) FILTER (WHERE "stars" = 1) AS star_1_count,
+                COUNT(*) FILTER (WHERE "stars" = 2) AS star_2_count,
+                COUNT(*) FILTER (WHERE "stars" = 3) AS star_3_count,
+                COUNT(*) FILTER (WHERE "stars" = 4) AS star_4_count,
+                COUNT(*) FILTER (WHERE "stars" = 5) AS star_5_count
+                FROM "formulas_review" GROUP BY "photo_id"
+            ) AS scores
+            WHERE "formulas_photo"."id" = scores."photo_id";
+        """, reverse_sql=migrations.RunSQL.noop),
+    ]
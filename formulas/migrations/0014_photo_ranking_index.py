@@ -0,0 +1,17 @@
+# Generated by Django 3.0.3 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0013_photo_review_scores'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['-total_reviews', '-created_at', '-updated_at', 'id'], name='photo_ranking_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.0.3 on 2026-10-18 15:02
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0014_photo_ranking_index'),
+    ]
+
+    # the indexed expressions match the SQL of icontains lookups:
+    # UPPER("field"::text) LIKE UPPER('%term%')
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(sql="""
+            CREATE INDEX photo_name_trgm ON formulas_photo
+            USING GIN(UPPER(name::text) gin_trgm_ops);
+            CREATE INDEX photo_description_trgm ON formulas_photo
+            USING GIN(UPPER(description::text) gin_trgm_ops);
+            CREATE INDEX subject_name_trgm ON formulas_subject
+            USING GIN(UPPER(name::text) gin_trgm_ops);
+            CREATE INDEX tag_name_trgm ON formulas_tag
+            USING GIN(UPPER(name::text) gin_trgm_ops);
+        """, reverse_sql="""
+            DROP INDEX photo_name_trgm;
+            DROP INDEX photo_description_trgm;
+            DROP INDEX subject_name_trgm;
+            DROP INDEX tag_name_trgm;
+        """),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.3 on 2026-10-18 14:31
+
+from django.db import migrations, models
+import formulas.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0015_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='preview',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=formulas.models.user_photos_directory_path),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=formulas.models.user_photos_directory_path),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.3 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0017_storage_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='last_reviewed_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
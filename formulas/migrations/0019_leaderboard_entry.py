@@ -0,0 +1,84 @@
+# Generated by Django 3.0.3 on 2026-10-18 14:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("formulas", "0018_photo_last_reviewed_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("exam_number", models.IntegerField(null=True)),
+                ("position", models.IntegerField()),
+                ("score", models.IntegerField()),
+                (
+                    "photo",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_entries",
+                        to="formulas.Photo",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_entries",
+                        to="formulas.Subject",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="leaderboardentry",
+            index=models.Index(
+                fields=["subject", "exam_number", "position"],
+                name="leaderboard_position_idx",
+            ),
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO "formulas_leaderboardentry" ("subject_id", "exam_number", "position", "photo_id", "score")
+            SELECT "subject_id", "exam_number", "position", "photo_id", "score" FROM (
+                SELECT c."subject_id", c."exam_number",
+                ROW_NUMBER() OVER (
+                    PARTITION BY c."subject_id", c."exam_number"
+                    ORDER BY p."total_reviews" DESC, p."created_at" DESC, p."updated_at" DESC, p."id" ASC
+                ) AS "position",
+                p."id" AS "photo_id", p."total_reviews" AS "score"
+                FROM "formulas_photo" p
+                JOIN "formulas_photoclassification" c ON c."id" = p."photo_classification_id"
+            ) AS ranked WHERE "position" <= 10
+            UNION ALL
+            SELECT "subject_id", "exam_number", "position", "photo_id", "score" FROM (
+                SELECT c."subject_id", NULL::integer AS "exam_number",
+                ROW_NUMBER() OVER (
+                    PARTITION BY c."subject_id"
+                    ORDER BY p."total_reviews" DESC, p."created_at" DESC, p."updated_at" DESC, p."id" ASC
+                ) AS "position",
+                p."id" AS "photo_id", p."total_reviews" AS "score"
+                FROM "formulas_photo" p
+                JOIN "formulas_photoclassification" c ON c."id" = p."photo_classification_id"
+            ) AS ranked WHERE "position" <= 10;
+        """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
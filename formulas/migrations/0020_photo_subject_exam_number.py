@@ -0,0 +1,59 @@
+# Generated by Django 3.0.3 on 2026-10-18 15:00
+
+from django.contrib.postgres.operations import BtreeGinExtension
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0019_leaderboard_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='exam_number',
+            field=models.IntegerField(null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(6)]),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='subject',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='formulas.Subject'),
+        ),
+        migrations.RunSQL(sql="""
+            UPDATE formulas_photo p
+            SET subject_id = c.subject_id, exam_number = c.exam_number
+            FROM formulas_photoclassification c
+            WHERE c.id = p.photo_classification_id;
+        """, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='photo',
+            name='exam_number',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(6)]),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='formulas.Subject'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['subject', '-total_reviews', '-created_at', '-updated_at', 'id'], name='photo_subject_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['subject', 'exam_number', '-total_reviews', '-created_at', '-updated_at', 'id'], name='photo_exam_ranking_idx'),
+        ),
+        # the searches of a subject are a single GIN index probe,
+        # btree_gin indexes the subject_id equality next to the tsvector
+        BtreeGinExtension(),
+        migrations.RunSQL(sql="""
+            CREATE INDEX photo_subject_search_vector ON formulas_photo
+            USING GIN(subject_id, search_vector);
+        """, reverse_sql="""
+            DROP INDEX photo_subject_search_vector;
+        """),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.3 on 2026-10-18 15:03
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0020_photo_subject_exam_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(sql="""
+            UPDATE formulas_photo p SET tag_ids = ARRAY(
+                SELECT pt.tag_id FROM formulas_photo_tags pt
+                WHERE pt.photo_id = p.id ORDER BY pt.tag_id
+            );
+        """, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='photo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='photo_tag_ids_gin'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.0.3 on 2026-10-18 15:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formulas', '0021_photo_tag_ids'),
+    ]
+
+    # a generated column can't read other tables, the document is now kept
+    # by formulas.search_documents, the indexes are dropped with the column
+    operations = [
+        migrations.RunSQL(sql="""
+            ALTER TABLE formulas_photo DROP COLUMN search_vector;
+            ALTER TABLE formulas_photo ADD COLUMN search_vector tsvector NULL;
+            UPDATE formulas_photo p SET search_vector =
+            setweight(to_tsvector('english', coalesce(p.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT string_agg(t.name, ' ') FROM formulas_photo_tags pt
+                JOIN formulas_tag t ON t.id = pt.tag_id WHERE pt.photo_id = p.id
+            ), '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(p.description, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT ctx.professor FROM formulas_photocontext ctx
+                WHERE ctx.id = p.photo_context_id
+            ), '')), 'C') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT s.name FROM formulas_subject s WHERE s.id = p.subject_id
+            ), '')), 'D');
+            CREATE INDEX search_vector ON formulas_photo
+            USING GIN(search_vector);
+            CREATE INDEX photo_subject_search_vector ON formulas_photo
+            USING GIN(subject_id, search_vector);
+        """, reverse_sql="""
+            ALTER TABLE formulas_photo DROP COLUMN search_vector;
+            ALTER TABLE "formulas_photo" ADD COLUMN "search_vector" tsvector
+            GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+            ' '
+            ) STORED NULL; CREATE INDEX search_vector ON formulas_photo
+            USING GIN(search_vector);
+            CREATE INDEX photo_subject_search_vector ON formulas_photo
+            USING GIN(subject_id, search_vector);
+        """),
+    ]
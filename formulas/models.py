@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Sum
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from core.models import TimestampedModel
@@ -63,18 +65,37 @@ def user_photos_directory_path(instance, filename):
     return "user_{0}/photos/{1}".format(instance.user.id, filename)
 
 
-class PhotoManager(models.Manager):
-    def get_queryset(self):
-        return (
-            super()
-            .get_queryset()
-            .annotate(total_reviews=Sum("reviews__stars"))
-            .order_by("-total_reviews", *TimestampedModel.Meta.ordering)
-        )
+# best reviewed photos first, the id makes the ordering unique for keyset pagination
+PHOTO_RANKING_ORDERING = ("-total_reviews", *TimestampedModel.Meta.ordering, "id")
+
+
+class PhotoQuerySet(models.QuerySet):
+    def ranked(self):
+        """
+        Best reviewed photos first, only for the listings, lookups and writes
+        don't need the ordering
+        """
+        return self.order_by(*PHOTO_RANKING_ORDERING)
+
+    def with_related(self):
+        """
+        Load everything PhotoSerializer renders, a fixed number of queries
+        regardless of the number of photos
+        """
+        return self.select_related(
+            "photo_classification__subject", "photo_context"
+        ).prefetch_related(models.Prefetch("tags", queryset=Tag.objects.order_by("pk")))
 
 
 class Photo(TimestampedModel):
     file = models.ImageField(upload_to=user_photos_directory_path, null=True)
+    # WebP variants of file, generated in the background by formulas.image_variants
+    thumbnail = models.ImageField(
+        upload_to=user_photos_directory_path, null=True, blank=True, editable=False
+    )
+    preview = models.ImageField(
+        upload_to=user_photos_directory_path, null=True, blank=True, editable=False
+    )
     name = models.CharField(max_length=120)
     description = models.TextField(blank=True)
     photo_classification = models.ForeignKey(
@@ -82,6 +103,18 @@ class Photo(TimestampedModel):
         on_delete=models.CASCADE,
         related_name="photos",
     )
+    # copies of the classification columns, the photos are filtered by them
+    # without joins, see copy_classification.
+    # The subject indexes of Meta start with subject_id
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        related_name="photos",
+        db_index=False,
+    )
+    exam_number = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(6)]
+    )
     photo_context = models.OneToOneField(
         PhotoContext, on_delete=models.CASCADE, related_name="photo", null=True
     )
@@ -91,8 +124,49 @@ class Photo(TimestampedModel):
         related_name="photos",
     )
     tags = models.ManyToManyField(Tag, related_name="photos")
+    # sorted copy of the tag pks, kept by formulas.photo_tags, "has all or any
+    # of these tags" is a single probe of its GIN index
+    tag_ids = ArrayField(models.IntegerField(), default=list, editable=False)
+
+    # review score counters, kept up to date by formulas.review_scores
+    total_reviews = models.IntegerField(default=0, db_index=True)
+    review_count = models.IntegerField(default=0, db_index=True)
+    star_1_count = models.IntegerField(default=0)
+    star_2_count = models.IntegerField(default=0)
+    star_3_count = models.IntegerField(default=0)
+    star_4_count = models.IntegerField(default=0)
+    star_5_count = models.IntegerField(default=0)
+    # changes with the counters, part of the conditional GET validators
+    last_reviewed_at = models.DateTimeField(null=True, editable=False)
+
+    objects = PhotoQuerySet.as_manager()
+
+    class Meta(TimestampedModel.Meta):
+        indexes = [
+            models.Index(fields=PHOTO_RANKING_ORDERING, name="photo_ranking_idx"),
+            # the listings of a subject, or an exam, in ranking order
+            models.Index(
+                fields=("subject", *PHOTO_RANKING_ORDERING),
+                name="photo_subject_ranking_idx",
+            ),
+            models.Index(
+                fields=("subject", "exam_number", *PHOTO_RANKING_ORDERING),
+                name="photo_exam_ranking_idx",
+            ),
+            GinIndex(fields=["tag_ids"], name="photo_tag_ids_gin"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.copy_classification()
+        super().save(*args, **kwargs)
 
-    objects = PhotoManager()
+    def copy_classification(self):
+        """
+        Copy the subject and the exam number of the classification,
+        bulk_create doesn't call save so the callers copy them
+        """
+        self.subject_id = self.photo_classification.subject_id
+        self.exam_number = self.photo_classification.exam_number
 
 
 class Review(models.Model):
@@ -116,3 +190,42 @@ class Review(models.Model):
                 fields=["photo", "user"], name="one review per photo"
             )
         ]
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Top photos of a subject exam, or of the whole subject when exam_number
+    is null, maintained by formulas.leaderboards
+    """
+
+    subject = models.ForeignKey(
+        Subject, on_delete=models.CASCADE, related_name="leaderboard_entries"
+    )
+    exam_number = models.IntegerField(null=True)
+    position = models.IntegerField()
+    photo = models.ForeignKey(
+        Photo, on_delete=models.CASCADE, related_name="leaderboard_entries"
+    )
+    score = models.IntegerField()
+
+    class Meta:
+        ordering = ["position"]
+        indexes = [
+            models.Index(
+                fields=["subject", "exam_number", "position"],
+                name="leaderboard_position_idx",
+            ),
+        ]
+
+
+class StorageDeletion(models.Model):
+    """
+    Outbox of stored files to delete, rows are added in the transaction that
+    stops referencing the file and formulas.storage_deletions removes them
+    """
+
+    name = models.CharField(max_length=255)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,38 @@
+from django.db import connection
+
+from formulas.models import Photo
+
+REFRESH_TAG_IDS_SQL = """
+    UPDATE {photo_table} p SET tag_ids = ARRAY(
+        SELECT pt.tag_id FROM {photo_tag_table} pt
+        WHERE pt.photo_id = p.id ORDER BY pt.tag_id
+    )
+    WHERE p.id = ANY(%s)
+    RETURNING p.id, p.tag_ids
+"""
+
+
+def refresh_tag_ids(photo_pks):
+    """
+    Copy the tags of the photos to their tag_ids arrays with a single UPDATE,
+    return the new arrays by photo pk
+    """
+    photo_pks = list(photo_pks)
+    if not photo_pks:
+        return {}
+
+    sql = REFRESH_TAG_IDS_SQL.format(
+        photo_table=Photo._meta.db_table,
+        photo_tag_table=Photo.tags.through._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [photo_pks])
+        return dict(cursor.fetchall())
+
+
+def refresh_tag_photos(tag_pk):
+    """Refresh the photos that had the tag, found through its GIN index"""
+    photo_pks = Photo.objects.filter(tag_ids__contains=[tag_pk]).values_list(
+        "pk", flat=True
+    )
+    return refresh_tag_ids(photo_pks)
@@ -1,45 +1,228 @@
 from django.contrib.postgres.search import SearchQuery, SearchVectorField
+from django.db.models import F, FloatField, Func, Subquery, TextField, Value
 from django.db.models.expressions import RawSQL
+from django.db.models.functions import Replace
 from drf_spectacular.utils import extend_schema_view
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from formulas import facets, search_queries, suggestions
 from formulas.docs import custom_query_docs
-from formulas.models import Photo
-from formulas.serializers import PhotoSerializer
+from formulas.models import PHOTO_RANKING_ORDERING, LeaderboardEntry, Photo, Subject
+from formulas.serializers import (
+    FacetsSerializer,
+    LeaderboardEntrySerializer,
+    PhotoSearchResultSerializer,
+    PhotoSerializer,
+    SuggestionsSerializer,
+    SuggestQuerySerializer,
+)
+from formulas.view_mixins import CachedResponseMixin, MyReviewMixin, PhotoRowsMixin
 
+RELEVANCE_ORDERING = "relevance"
+# 32 scales the rank to the range 0-1, rank / (rank + 1)
+RANK_NORMALIZATION = 32
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15"
+# & goes first, the entities of the other characters must not be escaped again
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"))
 
-@extend_schema_view(get=custom_query_docs.custom_schema)
-class SearchFormulaView(generics.ListAPIView):
-    name = "search_formula"
-    serializer_class = PhotoSerializer
+
+class TsRankCd(Func):
+    function = "ts_rank_cd"
+    output_field = FloatField()
+
+
+class TsHeadline(Func):
+    function = "ts_headline"
+    output_field = TextField()
+
+
+class SuggestView(generics.GenericAPIView):
+    name = "suggest"
+    serializer_class = SuggestionsSerializer
 
     permission_classes = [
         IsAuthenticated,
     ]
 
-    # no filter backends
     filter_backends = []
+    pagination_class = None
 
-    def get_queryset(self):
+    @custom_query_docs.suggest_schema
+    def get(self, request, *args, **kwargs):
+        query_serializer = SuggestQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        query = query_serializer.validated_data
 
-        filter_kwargs = {
-            "photo_classification__subject__name": self.kwargs["subject"],
+        kinds = [query["kind"]] if "kind" in query else suggestions.SUGGESTION_SOURCES
+        data = {
+            kind: suggestions.get_suggestions(kind, query["q"], query["limit"])
+            for kind in kinds
         }
-        exam_number_key = "photo_classification__exam_number"
+        return Response(data)
+
+
+@extend_schema_view(get=custom_query_docs.leaderboard_schema)
+class LeaderboardView(generics.ListAPIView):
+    name = "leaderboard"
+    serializer_class = LeaderboardEntrySerializer
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    # the leaderboards are small, no filters nor pagination
+    filter_backends = []
+    pagination_class = None
+
+    def get_queryset(self):
+        return (
+            LeaderboardEntry.objects.filter(
+                subject__name=self.kwargs["subject"],
+                exam_number=self.kwargs.get("exam_number"),
+            )
+            .select_related(
+                "photo__photo_classification__subject", "photo__photo_context"
+            )
+            .prefetch_related("photo__tags")
+        )
+
+
+class SubjectPhotosMixin:
+    """
+    Photos of the subject, and exam number, of the url
+    that match the search term of the query params
+    """
+
+    def get_subject_photos(self, query_set):
+        # the subject pk is looked up once, the photos are filtered by their own
+        # columns, see the subject indexes of Photo
+        subject_pk = Subject.objects.filter(name=self.kwargs["subject"]).values("pk")
+        filter_kwargs = {"subject": Subquery(subject_pk)}
         if "exam_number" in self.kwargs:
-            filter_kwargs[exam_number_key] = self.kwargs.get("exam_number")
+            filter_kwargs["exam_number"] = self.kwargs.get("exam_number")
 
-        query_set = Photo.objects.filter(**filter_kwargs)
+        query_set = query_set.filter(**filter_kwargs)
         # search filter
-        search_term = self.request.query_params.get("search")
-        if search_term:
-            sentences = search_term.split()
-            sentences = map(lambda w: f"'{w}'", sentences)
-            search_query = " & ".join(sentences)
-
+        search_query = self.get_search_query()
+        if search_query is not None:
             query_set = query_set.annotate(
                 ts=RawSQL("search_vector", params=[], output_field=SearchVectorField())
-            ).filter(ts=SearchQuery(search_query, search_type="raw", config="english"))
+            ).filter(ts=search_query)
+
+        return query_set
+
+    def get_search_query(self):
+        search_query = search_queries.parse_search_query(
+            self.request.query_params.get("search", "")
+        )
+        if search_query is None:
+            return None
+        return SearchQuery(search_query, search_type="raw", config="english")
+
+
+class FacetsView(CachedResponseMixin, SubjectPhotosMixin, generics.GenericAPIView):
+    name = "facets"
+    serializer_class = FacetsSerializer
+    # the counts change with the photos and the names of their relations
+    cache_dependencies = (
+        "photo",
+        "photocontext",
+        "photoclassification",
+        "subject",
+        "tag",
+    )
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    filter_backends = []
+    pagination_class = None
+
+    @custom_query_docs.facets_schema
+    def get(self, request, *args, **kwargs):
+        return self.get_cached_response(self.get_facets, request, *args, **kwargs)
+
+    def get_facets(self, request, *args, **kwargs):
+        photos = self.get_subject_photos(Photo.objects.all())
+        return Response(facets.get_facets(photos))
+
+
+@extend_schema_view(get=custom_query_docs.custom_schema)
+class SearchFormulaView(
+    MyReviewMixin, PhotoRowsMixin, SubjectPhotosMixin, generics.ListAPIView
+):
+    name = "search_formula"
+    serializer_class = PhotoSerializer
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    # no filter backends
+    filter_backends = []
+    keyset_ordering = PHOTO_RANKING_ORDERING
+    estimate_count = True
+
+    def get_queryset(self):
+        query_set = self.get_subject_photos(Photo.objects.with_related().ranked())
+        if self.is_ordered_by_relevance():
+            query_set = query_set.annotate(
+                rank=TsRankCd(
+                    F("ts"), self.get_search_query(), Value(RANK_NORMALIZATION)
+                )
+            ).order_by("-rank", *PHOTO_RANKING_ORDERING)
 
         return query_set
+
+    def is_ordered_by_relevance(self):
+        return (
+            self.request.query_params.get("ordering") == RELEVANCE_ORDERING
+            and self.get_search_query() is not None
+        )
+
+    def get_keyset_ordering(self):
+        # relevance is not a column, these results use page number pagination
+        if self.is_ordered_by_relevance():
+            return None
+        return self.keyset_ordering
+
+    def get_serializer_class(self):
+        if self.is_ordered_by_relevance():
+            return PhotoSearchResultSerializer
+        return super().get_serializer_class()
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.is_ordered_by_relevance():
+            self.headlines = self.get_headlines([photo.pk for photo in page])
+        return page
+
+    def get_headlines(self, photo_pks):
+        """
+        Highlight the search terms in the descriptions,
+        only for the photos of the current page
+        """
+        # the headline is html, only its <mark> tags may reach the client
+        description = F("description")
+        for character, entity in HTML_ESCAPES:
+            description = Replace(description, Value(character), Value(entity))
+        headline = TsHeadline(
+            Value("english"),
+            description,
+            self.get_search_query(),
+            Value(HEADLINE_OPTIONS),
+        )
+        return dict(
+            Photo.objects.filter(pk__in=photo_pks)
+            .order_by()
+            .annotate(headline=headline)
+            .values_list("pk", "headline")
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["headlines"] = getattr(self, "headlines", {})
+        return context
@@ -0,0 +1,110 @@
+from django.db.models import Count, F, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce, Now
+
+from formulas import leaderboards
+from formulas.models import Photo, Review
+
+STAR_VALUES = range(1, 6)
+
+
+def star_count_field(stars):
+    return "star_{0}_count".format(stars)
+
+
+def _apply_score_change(photo_id, stars, delta):
+    # F expressions make the update atomic, concurrent reviews don't lose counts
+    Photo.objects.filter(pk=photo_id).update(
+        total_reviews=F("total_reviews") + stars * delta,
+        review_count=F("review_count") + delta,
+        last_reviewed_at=Now(),
+        **{star_count_field(stars): F(star_count_field(stars)) + delta}
+    )
+    leaderboards.schedule_photo_refresh(photo_id)
+
+
+def add_review_score(photo_id, stars):
+    _apply_score_change(photo_id, stars, 1)
+
+
+def remove_review_score(photo_id, stars):
+    _apply_score_change(photo_id, stars, -1)
+
+
+def remove_user_review_scores(user_id):
+    """
+    Subtract the reviews of the user from their photos, call it before the
+    reviews are deleted by a cascade that doesn't go through the views
+    """
+    reviews = (
+        Review.objects.select_for_update()
+        .filter(user_id=user_id)
+        .order_by("photo_id")
+        .values_list("photo_id", "stars")
+    )
+    for photo_id, stars in reviews:
+        remove_review_score(photo_id, stars)
+
+
+def change_review_score(old_photo_id, old_stars, new_photo_id, new_stars):
+    if old_photo_id == new_photo_id and old_stars == new_stars:
+        return
+    remove_review_score(old_photo_id, old_stars)
+    add_review_score(new_photo_id, new_stars)
+
+
+def computed_scores(queryset):
+    """
+    Annotate the real review scores computed from the review table,
+    these values are the ones stored in the score counters
+    """
+    star_annotations = {}
+    for stars in STAR_VALUES:
+        star_field = "computed_" + star_count_field(stars)
+        star_annotations[star_field] = Count("reviews", filter=Q(reviews__stars=stars))
+    return queryset.order_by().annotate(
+        computed_total_reviews=Coalesce(
+            Sum("reviews__stars"), Value(0), output_field=IntegerField()
+        ),
+        computed_review_count=Count("reviews"),
+        **star_annotations
+    )
+
+
+def score_fields():
+    return [
+        "total_reviews",
+        "review_count",
+        *[star_count_field(stars) for stars in STAR_VALUES],
+    ]
+
+
+def find_outdated_scores(queryset):
+    """
+    Return a list of (photo pk, {field: (stored, computed)}) for every photo
+    whose counters differ from its reviews
+    """
+    outdated = []
+    for photo in computed_scores(queryset).iterator():
+        differences = {}
+        for field in score_fields():
+            stored = getattr(photo, field)
+            computed = getattr(photo, "computed_" + field)
+            if stored != computed:
+                differences[field] = (stored, computed)
+        if differences:
+            outdated.append((photo.pk, differences))
+    return outdated
+
+
+def rebuild_scores(queryset):
+    """
+    Recompute the score counters of the given photos from the review table,
+    return the number of photos whose counters were fixed
+    """
+    outdated = find_outdated_scores(queryset)
+    for photo_pk, differences in outdated:
+        Photo.objects.filter(pk=photo_pk).update(
+            last_reviewed_at=Now(),
+            **{field: computed for field, (_, computed) in differences.items()}
+        )
+    return len(outdated)
@@ -0,0 +1,110 @@
+from django.db import connection, transaction
+
+from formulas import review_scores
+from formulas.models import Photo, Review
+
+UPSERT_SQL = """
+    WITH input AS (
+        SELECT * FROM unnest(%(photo_ids)s::integer[], %(stars)s::integer[])
+        WITH ORDINALITY AS input(photo_id, stars, position)
+    ), upserted AS (
+        INSERT INTO {review_table} (photo_id, user_id, stars)
+        SELECT input.photo_id, %(user_id)s, input.stars
+        FROM input JOIN {photo_table} p ON p.id = input.photo_id
+        WHERE p.user_id <> %(user_id)s
+        ORDER BY input.position
+        ON CONFLICT (photo_id, user_id) DO UPDATE SET stars = EXCLUDED.stars
+        RETURNING id, photo_id, stars, xmax = 0 AS created
+    )
+    SELECT input.photo_id, p.user_id, upserted.id, upserted.stars, upserted.created
+    FROM input
+    LEFT JOIN {photo_table} p ON p.id = input.photo_id
+    LEFT JOIN upserted ON upserted.photo_id = input.photo_id
+    ORDER BY input.position
+"""
+
+PHOTO_DOES_NOT_EXIST = "photo_does_not_exist"
+PHOTO_OWNER = "photo_owner"
+
+
+def lock_current_stars(user_id, photo_ids):
+    """
+    Lock the existing reviews so the counters are updated from the stars
+    the upsert replaces
+    """
+    return dict(
+        Review.objects.select_for_update()
+        .filter(user_id=user_id, photo_id__in=photo_ids)
+        .order_by("photo_id")
+        .values_list("photo_id", "stars")
+    )
+
+
+def upsert_reviews(user_id, items):
+    """
+    Set the stars of the user for each (photo_id, stars) with a single
+    INSERT ... ON CONFLICT DO UPDATE, which skips the missing photos and the
+    photos of the user. Return a dict for each item, in the same order, with
+    the review or the error of the item, none of the reviews is saved when
+    an item has an error. The photo ids must be unique
+    """
+    # the rows are locked in photo order, concurrent batches can't deadlock
+    positions = sorted(range(len(items)), key=lambda position: items[position][0])
+    results = upsert_sorted_reviews(
+        user_id, [items[position] for position in positions]
+    )
+
+    request_results = [None] * len(items)
+    for position, result in zip(positions, results):
+        request_results[position] = result
+    return request_results
+
+
+def upsert_sorted_reviews(user_id, items):
+    photo_ids = [photo_id for photo_id, _ in items]
+    sql = UPSERT_SQL.format(
+        review_table=Review._meta.db_table, photo_table=Photo._meta.db_table
+    )
+    params = {
+        "photo_ids": photo_ids,
+        "stars": [stars for _, stars in items],
+        "user_id": user_id,
+    }
+
+    with transaction.atomic():
+        old_stars = lock_current_stars(user_id, photo_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        results = [get_result(user_id, *row) for row in rows]
+        if any("error" in result for result in results):
+            transaction.set_rollback(True)
+            return results
+
+        for result in results:
+            photo_id, stars = result["photo"], result["stars"]
+            if result["created"]:
+                review_scores.add_review_score(photo_id, stars)
+            elif photo_id in old_stars:
+                review_scores.change_review_score(
+                    photo_id, old_stars[photo_id], photo_id, stars
+                )
+            else:
+                # inserted by a concurrent request after the lock
+                review_scores.rebuild_scores(Photo.objects.filter(pk=photo_id))
+    return results
+
+
+def get_result(user_id, photo_id, owner_id, review_id, stars, created):
+    if owner_id is None:
+        return {"photo": photo_id, "error": PHOTO_DOES_NOT_EXIST}
+    if review_id is None:
+        return {"photo": photo_id, "error": PHOTO_OWNER}
+    return {
+        "pk": review_id,
+        "photo": photo_id,
+        "user": user_id,
+        "stars": stars,
+        "created": created,
+    }
@@ -0,0 +1,64 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+
+from formulas.models import Photo, PhotoContext, Subject, Tag
+
+# parts of the search document of a photo and their weights, A is the highest
+SEARCH_DOCUMENT_PARTS = (
+    ("p.name", "A"),
+    (
+        """(
+            SELECT string_agg(t.name, ' ') FROM {photo_tag_table} pt
+            JOIN {tag_table} t ON t.id = pt.tag_id WHERE pt.photo_id = p.id
+        )""",
+        "B",
+    ),
+    ("p.description", "B"),
+    (
+        "(SELECT ctx.professor FROM {context_table} ctx "
+        "WHERE ctx.id = p.photo_context_id)",
+        "C",
+    ),
+    ("(SELECT s.name FROM {subject_table} s WHERE s.id = p.subject_id)", "D"),
+)
+
+REFRESH_SEARCH_VECTORS_SQL = """
+    UPDATE {photo_table} p SET search_vector = {document}
+    WHERE p.id IN ({photos})
+"""
+
+
+def get_search_document_sql():
+    document = " || ".join(
+        "setweight(to_tsvector('english', coalesce({0}, '')), '{1}')".format(
+            column, weight
+        )
+        for column, weight in SEARCH_DOCUMENT_PARTS
+    )
+    return document.format(
+        photo_tag_table=Photo.tags.through._meta.db_table,
+        tag_table=Tag._meta.db_table,
+        context_table=PhotoContext._meta.db_table,
+        subject_table=Subject._meta.db_table,
+    )
+
+
+def refresh_search_vectors(photos):
+    """
+    Rebuild the search documents of the photos of the queryset with a single
+    UPDATE, the document has the name, the tags, the description, the
+    professor and the subject of the photo. Return the number of photos
+    """
+    try:
+        photos_sql, params = photos.order_by().values("pk").query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+
+    sql = REFRESH_SEARCH_VECTORS_SQL.format(
+        photo_table=Photo._meta.db_table,
+        document=get_search_document_sql(),
+        photos=photos_sql,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
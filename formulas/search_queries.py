@@ -0,0 +1,71 @@
+import re
+
+OR_KEYWORD = "or"
+PREFIX_SUFFIX = "*"
+MAX_SEARCH_WORDS = 32
+# longer words can't be part of a tsquery, none of them is a formula term
+MAX_WORD_LENGTH = 255
+
+# an optionally negated quoted phrase, the closing quote may be missing,
+# or an optionally negated word
+TOKEN_REGEX = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))')
+# only these characters reach the tsquery, none of them is a tsquery operator
+WORD_REGEX = re.compile(r"\w+")
+
+
+def parse_search_query(text):
+    """
+    Translate the text of a search box to a raw tsquery for to_tsquery,
+    the syntax is like websearch_to_tsquery:
+    * words must all match: `integral volume`
+    * "quoted words" match as a phrase
+    * or between words matches any side: `integral or derivative`
+    * -word or -"quoted words" exclude the photos that match them
+    * word* matches the words that start with word
+    Words keep only their letters, digits and underscores, so no text makes
+    an invalid tsquery. Return None when the text has no words
+    """
+    groups = []
+    group = []
+    words_left = MAX_SEARCH_WORDS
+
+    for match in TOKEN_REGEX.finditer(text):
+        negated, phrase, word = match.groups()
+        if word is not None and not negated and word.lower() == OR_KEYWORD:
+            if group:
+                groups.append(group)
+                group = []
+            continue
+
+        if phrase is not None:
+            words, prefix = get_words(phrase), False
+        else:
+            words, prefix = get_words(word), word.endswith(PREFIX_SUFFIX)
+        words = words[:words_left]
+        if not words:
+            continue
+        words_left -= len(words)
+
+        operand = get_operand(words, prefix)
+        group.append("!" + operand if negated else operand)
+
+    if group:
+        groups.append(group)
+    if not groups:
+        return None
+    return " | ".join(" & ".join(group) for group in groups)
+
+
+def get_words(text):
+    return [word for word in WORD_REGEX.findall(text) if len(word) <= MAX_WORD_LENGTH]
+
+
+def get_operand(words, prefix):
+    # \w never matches quotes nor backslashes, the lexemes need no escaping
+    lexemes = ["'{0}'".format(word) for word in words]
+    if prefix:
+        lexemes[-1] += ":*"
+    if len(lexemes) == 1:
+        return lexemes[0]
+    # like websearch_to_tsquery, e=mc2 or a quoted phrase are a phrase
+    return "({0})".format(" <-> ".join(lexemes))
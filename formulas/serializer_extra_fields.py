@@ -1,4 +1,10 @@
-from rest_framework.relations import SlugRelatedField
+from rest_framework.relations import (
+    MANY_RELATION_KWARGS,
+    ManyRelatedField,
+    SlugRelatedField,
+)
+
+from formulas.bulk_lookups import get_or_create_by_slugs
 
 """ copy from https://github.com/Hipo/drf-extra-fields/blob/master/drf_extra_fields/fields.py """
 
@@ -11,10 +17,49 @@ class SlugGetOrCreateRelatedField(SlugRelatedField):
             self.internal_validators = internal_validators
         super().__init__(slug_field=slug_field, **kwargs)
 
-    def to_internal_value(self, data):
-        try:
-            for internal_validator in self.internal_validators:
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManySlugGetOrCreateRelatedField(**list_kwargs)
+
+    def to_slug(self, data):
+        if not isinstance(data, (str, int)) or isinstance(data, bool):
+            self.fail("invalid")
+        for internal_validator in self.internal_validators:
+            try:
                 internal_validator(data)
-            return self.get_queryset().get_or_create(**{self.slug_field: data})[0]
-        except (TypeError, ValueError):
+            except (TypeError, ValueError):
+                # validators of strings, like validate_subject_slug
+                self.fail("invalid")
+        slug = str(data)
+        # postgres text can't store it, the lookup would raise ValueError
+        if "\x00" in slug:
             self.fail("invalid")
+        return slug
+
+    def get_or_create_many(self, slugs):
+        model = self.get_queryset().model
+        return get_or_create_by_slugs(model, slugs, slug_field=self.slug_field)
+
+    def to_internal_value(self, data):
+        slug = self.to_slug(data)
+        return self.get_or_create_many([slug])[slug]
+
+
+class ManySlugGetOrCreateRelatedField(ManyRelatedField):
+    """
+    Resolve all the slugs with one SELECT and one INSERT for the missing ones
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        slugs = [self.child_relation.to_slug(item) for item in data]
+        instances = self.child_relation.get_or_create_many(slugs)
+        return [instances[slug] for slug in dict.fromkeys(slugs)]
@@ -5,7 +5,15 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.fields import ImageField
 
+from formulas import (
+    bulk_photos,
+    image_variants,
+    review_upserts,
+    storage_deletions,
+    suggestions,
+)
 from formulas.models import (
+    LeaderboardEntry,
     Photo,
     PhotoClassification,
     PhotoContext,
@@ -90,15 +98,42 @@ class TagSerializer(serializers.ModelSerializer):
         )
 
 
+MY_REVIEW_FIELDS = ("review_count", "my_review")
+# the columns PhotoSerializer.update writes, plus the file and its variants
+# when the file is replaced
+PHOTO_UPDATE_FIELDS = (
+    "name",
+    "description",
+    "photo_classification",
+    "subject",
+    "exam_number",
+    "photo_context",
+    "updated_at",
+)
+
+
 class PhotoSerializer(serializers.ModelSerializer):
 
-    user = serializers.ReadOnlyField(source="user.pk")
+    user = serializers.ReadOnlyField(source="user_id")
     tags = SlugGetOrCreateRelatedField(
         many=True, slug_field="name", queryset=Tag.objects.all(), required=False
     )
     file = ImageField(allow_null=True, required=False)
     photo_classification = PhotoClassificationSerializer()
     photo_context = PhotoContextSerializer(required=False)
+    review_count = serializers.IntegerField(read_only=True)
+    my_review = serializers.SerializerMethodField()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # only when the view loaded the reviews of the request user
+        if "my_reviews" not in self.context:
+            for field_name in MY_REVIEW_FIELDS:
+                del fields[field_name]
+        return fields
+
+    def get_my_review(self, photo):
+        return self.context["my_reviews"].get(photo.pk)
 
     def validate_file(self, file):
         MAX_FILE_SIZE = 5000000
@@ -134,13 +169,21 @@ class PhotoSerializer(serializers.ModelSerializer):
         return photo
 
     def update(self, instance, validated_data):
+        # only the edited columns, the review counters and the image variants
+        # may have changed since the instance was loaded
+        update_fields = list(PHOTO_UPDATE_FIELDS)
 
         instance.name = validated_data.get("name", instance.name)
         instance.description = validated_data.get("description", instance.description)
 
         if "file" in validated_data:
-            instance.file.delete()
+            storage_deletions.enqueue_deletion(
+                instance.file.name, *image_variants.get_variant_names(instance)
+            )
             instance.file = validated_data["file"]
+            for field_name in image_variants.VARIANT_FIELDS:
+                setattr(instance, field_name, None)
+            update_fields.extend(["file", *image_variants.VARIANT_FIELDS])
 
         photo_classification_new_data = validated_data.get("photo_classification", None)
 
@@ -172,8 +215,9 @@ class PhotoSerializer(serializers.ModelSerializer):
 
         if "tags" in validated_data:
             instance.tags.set(validated_data["tags"])
+            update_fields.append("tag_ids")
 
-        instance.save()
+        instance.save(update_fields=update_fields)
         return instance
 
     class Meta:
@@ -182,6 +226,8 @@ class PhotoSerializer(serializers.ModelSerializer):
             "pk",
             "name",
             "file",
+            "thumbnail",
+            "preview",
             "description",
             "photo_classification",
             "photo_context",
@@ -189,17 +235,124 @@ class PhotoSerializer(serializers.ModelSerializer):
             "tags",
             "created_at",
             "updated_at",
+            *MY_REVIEW_FIELDS,
+        )
+
+
+class PhotoSearchResultSerializer(PhotoSerializer):
+
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.SerializerMethodField()
+
+    def get_headline(self, photo) -> str:
+        return self.context.get("headlines", {}).get(photo.pk, "")
+
+    class Meta(PhotoSerializer.Meta):
+        fields = PhotoSerializer.Meta.fields + ("rank", "headline")
+
+
+MAX_BULK_PHOTOS = 50
+
+
+class PhotoBulkClassificationSerializer(PhotoClassificationSerializer):
+    # subjects are resolved for all the photos at once by bulk_photos
+    subject = serializers.CharField(max_length=80, validators=[validate_subject_slug])
+
+
+class PhotoBulkListSerializer(serializers.ListSerializer):
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError(_("Send at least one photo"))
+        if len(data) > MAX_BULK_PHOTOS:
+            raise serializers.ValidationError(
+                _("Send at most {0} photos").format(MAX_BULK_PHOTOS)
+            )
+        return data
+
+    def create(self, validated_data):
+        return bulk_photos.create_photos(validated_data)
+
+
+class PhotoBulkItemSerializer(PhotoSerializer):
+    """
+    Validate a photo of a bulk upload without touching the database
+    """
+
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=60), required=False
+    )
+    photo_classification = PhotoBulkClassificationSerializer()
+
+    class Meta(PhotoSerializer.Meta):
+        list_serializer_class = PhotoBulkListSerializer
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+
+    photo = PhotoSerializer(read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = (
+            "position",
+            "score",
+            "photo",
         )
 
 
+class FacetValueSerializer(serializers.Serializer):
+
+    value = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class ExamNumberFacetValueSerializer(FacetValueSerializer):
+
+    value = serializers.IntegerField()
+
+
+class FacetsSerializer(serializers.Serializer):
+
+    count = serializers.IntegerField()
+    tag = FacetValueSerializer(many=True)
+    exam_number = ExamNumberFacetValueSerializer(many=True)
+    formula_type = FacetValueSerializer(many=True)
+
+
+class SuggestionSerializer(serializers.Serializer):
+
+    name = serializers.CharField()
+    usage = serializers.IntegerField()
+
+
+class SuggestionsSerializer(serializers.Serializer):
+
+    tag = SuggestionSerializer(many=True, required=False)
+    subject = SuggestionSerializer(many=True, required=False)
+    professor = SuggestionSerializer(many=True, required=False)
+
+
+class SuggestQuerySerializer(serializers.Serializer):
+
+    q = serializers.CharField(max_length=80, trim_whitespace=False)
+    kind = serializers.ChoiceField(
+        choices=("tag", "subject", "professor"), required=False
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=50, default=suggestions.DEFAULT_LIMIT
+    )
+
+
 class ReviewSerializer(serializers.ModelSerializer):
 
-    user = serializers.ReadOnlyField(source="user.pk")
+    user = serializers.ReadOnlyField(source="user_id")
+    # the owner is all the validation needs from the photo
+    photo = serializers.PrimaryKeyRelatedField(queryset=Photo.objects.only("user"))
 
     def validate(self, data):
         if "photo" in data:
             user = self.context["request"].user
-            if user == data["photo"].user:
+            if user.pk == data["photo"].user_id:
                 raise serializers.ValidationError(_("Photo owner cannot make a review"))
 
         return data
@@ -212,3 +365,68 @@ class ReviewSerializer(serializers.ModelSerializer):
             "photo",
             "user",
         )
+
+
+MAX_BULK_REVIEWS = 50
+# the upsert statement casts the photo pks to integer[]
+MAX_PHOTO_PK = 2 ** 31 - 1
+
+REVIEW_UPSERT_ERRORS = {
+    review_upserts.PHOTO_DOES_NOT_EXIST: _('Invalid pk "{0}" - object does not exist.'),
+    review_upserts.PHOTO_OWNER: _("Photo owner cannot make a review"),
+}
+
+
+def get_review_upsert_error(result):
+    if "error" not in result:
+        return {}
+    return {"photo": [REVIEW_UPSERT_ERRORS[result["error"]].format(result["photo"])]}
+
+
+def save_review_upserts(items):
+    results = review_upserts.upsert_reviews(
+        items[0]["user"].pk, [(item["photo"], item["stars"]) for item in items]
+    )
+    errors = [get_review_upsert_error(result) for result in results]
+    if any(errors):
+        raise serializers.ValidationError(errors)
+    return results
+
+
+class ReviewUpsertListSerializer(serializers.ListSerializer):
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError(_("Send at least one review"))
+        if len(data) > MAX_BULK_REVIEWS:
+            raise serializers.ValidationError(
+                _("Send at most {0} reviews").format(MAX_BULK_REVIEWS)
+            )
+        photos = [item["photo"] for item in data]
+        if len(set(photos)) < len(photos):
+            raise serializers.ValidationError(_("Send one review per photo"))
+        return data
+
+    def create(self, validated_data):
+        return save_review_upserts(validated_data)
+
+
+class ReviewUpsertSerializer(serializers.Serializer):
+    """
+    Set the stars of the request user for a photo, the photo is checked
+    by the upsert statement instead of being loaded
+    """
+
+    pk = serializers.IntegerField(read_only=True)
+    stars = serializers.IntegerField(min_value=1, max_value=5)
+    photo = serializers.IntegerField(min_value=1, max_value=MAX_PHOTO_PK)
+    user = serializers.IntegerField(read_only=True)
+    created = serializers.BooleanField(read_only=True)
+
+    def create(self, validated_data):
+        try:
+            return save_review_upserts([validated_data])[0]
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError(error.detail[0])
+
+    class Meta:
+        list_serializer_class = ReviewUpsertListSerializer
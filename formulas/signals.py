@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import Profile
+from . import cache_versions, photo_tags, review_scores, search_documents, suggestions
+from .models import Photo, PhotoClassification, PhotoContext, Profile, Subject, Tag
 
 User = get_user_model()
 
@@ -11,3 +12,114 @@ User = get_user_model()
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_review_scores(sender, instance, **kwargs):
+    # the cascade deletes the reviews of the user without updating the scores
+    review_scores.remove_user_review_scores(instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=PhotoClassification)
+@receiver(post_delete, sender=PhotoClassification)
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(post_save, sender=PhotoContext)
+@receiver(post_delete, sender=PhotoContext)
+def invalidate_cached_responses(sender, **kwargs):
+    cache_versions.bump_version_on_commit(sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Photo.tags.through)
+def invalidate_photo_tags(sender, **kwargs):
+    cache_versions.bump_version_on_commit(Photo._meta.model_name)
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(post_save, sender=PhotoContext)
+@receiver(post_delete, sender=PhotoContext)
+@receiver(m2m_changed, sender=Photo.tags.through)
+def invalidate_suggestions(sender, **kwargs):
+    # usage counts of tags, subjects and professors
+    suggestions.bump_suggestions_version()
+
+
+@receiver(post_save, sender=PhotoClassification)
+def copy_classification_to_photos(sender, instance, created, **kwargs):
+    # the photos keep copies of the subject and the exam number
+    if not created:
+        instance.photos.update(
+            subject_id=instance.subject_id, exam_number=instance.exam_number
+        )
+        search_documents.refresh_search_vectors(instance.photos.all())
+        # the update doesn't send signals
+        cache_versions.bump_version_on_commit(Photo._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Photo.tags.through)
+def refresh_photo_tag_ids(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    # add and remove send an empty pk_set when nothing changes
+    if pk_set is not None and not pk_set:
+        return
+
+    if not reverse:
+        tag_ids = photo_tags.refresh_tag_ids([instance.pk])
+        # PhotoSerializer.update saves the photo after tags.set
+        instance.tag_ids = tag_ids.get(instance.pk, [])
+    elif action == "post_clear":
+        tag_ids = photo_tags.refresh_tag_photos(instance.pk)
+    else:
+        tag_ids = photo_tags.refresh_tag_ids(pk_set)
+    # the tag names are part of the search documents
+    search_documents.refresh_search_vectors(Photo.objects.filter(pk__in=list(tag_ids)))
+
+
+@receiver(post_delete, sender=Tag)
+def remove_deleted_tag_ids(sender, instance, **kwargs):
+    # the cascade deletes the photo tags without m2m_changed
+    tag_ids = photo_tags.refresh_tag_photos(instance.pk)
+    search_documents.refresh_search_vectors(Photo.objects.filter(pk__in=list(tag_ids)))
+
+
+SEARCH_DOCUMENT_FIELDS = {
+    "name",
+    "description",
+    "photo_classification",
+    "photo_context",
+}
+
+
+@receiver(post_save, sender=Photo)
+def refresh_photo_search_vector(sender, instance, update_fields, **kwargs):
+    if update_fields is None or SEARCH_DOCUMENT_FIELDS.intersection(update_fields):
+        search_documents.refresh_search_vectors(Photo.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=PhotoContext)
+def refresh_professor_search_vectors(sender, instance, created, **kwargs):
+    # a new context has no photo yet
+    if not created:
+        search_documents.refresh_search_vectors(
+            Photo.objects.filter(photo_context=instance)
+        )
+
+
+@receiver(post_save, sender=Subject)
+def refresh_subject_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        search_documents.refresh_search_vectors(Photo.objects.filter(subject=instance))
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        search_documents.refresh_search_vectors(
+            Photo.objects.filter(tag_ids__contains=[instance.pk])
+        )
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from formulas import background
+from formulas.models import StorageDeletion
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+# doubled after each failed attempt
+RETRY_DELAY = timedelta(seconds=30)
+# time a worker has to delete the files of the batch it claimed
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_deletion(*names):
+    """
+    Record the names of the stored files to delete, call it in the transaction
+    that stops referencing them, the files are deleted after the commit
+    """
+    names = [name for name in names if name]
+    if not names:
+        return
+    StorageDeletion.objects.bulk_create(StorageDeletion(name=name) for name in names)
+    background.schedule(drain_deletions)
+
+
+def claim_batch(batch_size, now):
+    with transaction.atomic():
+        # other workers skip the locked rows instead of deleting them twice
+        deletions = list(
+            StorageDeletion.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        # the lease keeps the rows from the other workers after the commit,
+        # they are due again if this worker dies before recording the outcome
+        StorageDeletion.objects.filter(
+            pk__in=[deletion.pk for deletion in deletions]
+        ).update(next_attempt_at=now + CLAIM_LEASE)
+    return deletions
+
+
+def delete_batch(storage, batch_size):
+    now = timezone.now()
+    deletions = claim_batch(batch_size, now)
+
+    # no transaction or row lock is held while the storage answers
+    deleted_pks = []
+    failed = []
+    for deletion in deletions:
+        try:
+            storage.delete(deletion.name)
+        except Exception as error:
+            deletion.attempts += 1
+            deletion.next_attempt_at = now + RETRY_DELAY * 2 ** (deletion.attempts - 1)
+            deletion.last_error = repr(error)
+            failed.append(deletion)
+        else:
+            deleted_pks.append(deletion.pk)
+
+    with transaction.atomic():
+        StorageDeletion.objects.filter(pk__in=deleted_pks).delete()
+        StorageDeletion.objects.bulk_update(
+            failed, ["attempts", "next_attempt_at", "last_error"]
+        )
+    return len(deleted_pks), len(failed)
+
+
+def drain_deletions(batch_size=BATCH_SIZE, storage=None):
+    """
+    Delete the due files in batches until there is nothing left to do,
+    return the number of deleted files and of failed attempts
+    """
+    storage = storage or default_storage
+    total_deleted = total_failed = 0
+    while True:
+        deleted, failed = delete_batch(storage, batch_size)
+        total_deleted += deleted
+        total_failed += failed
+        if deleted + failed < batch_size:
+            return total_deleted, total_failed
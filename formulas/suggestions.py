@@ -0,0 +1,131 @@
+import heapq
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Count
+
+from formulas import background, cache_versions
+from formulas.models import PhotoContext, Subject, Tag
+
+# bumped when the usage counts change, tag and subject names have their own
+SUGGESTIONS_VERSION = "suggestions"
+# prefixes this short match many names, their results are memoized
+SHORT_PREFIX_LENGTH = 2
+DEFAULT_LIMIT = 10
+
+
+def get_tag_usages():
+    return Tag.objects.annotate(usage=Count("photos")).values_list("name", "usage")
+
+
+def get_subject_usages():
+    return Subject.objects.annotate(
+        usage=Count("photo_classifications__photos")
+    ).values_list("name", "usage")
+
+
+def get_professor_usages():
+    return (
+        PhotoContext.objects.exclude(professor="")
+        .values("professor")
+        .annotate(usage=Count("photo"))
+        .values_list("professor", "usage")
+    )
+
+
+SUGGESTION_SOURCES = {
+    "tag": (get_tag_usages, ("tag", SUGGESTIONS_VERSION)),
+    "subject": (get_subject_usages, ("subject", SUGGESTIONS_VERSION)),
+    "professor": (get_professor_usages, (SUGGESTIONS_VERSION,)),
+}
+
+
+class PrefixIndex:
+    """
+    Names sorted by their lowercase form, the names with a prefix are a
+    contiguous slice found by binary search, the top K of the slice by usage
+    are selected with a heap
+    """
+
+    def __init__(self, usages, version):
+        entries = sorted((name.lower(), -usage, name) for name, usage in usages if name)
+        self.keys = [key for key, _, _ in entries]
+        self.entries = [(name, -negative_usage) for _, negative_usage, name in entries]
+        self.version = version
+        self.built_at = time.monotonic()
+        self.short_prefix_results = {}
+
+    def search(self, prefix, limit):
+        prefix = prefix.lower()
+        # only ascii prefixes at the default limit, the memo can't outgrow
+        # the 128 * 128 prefixes of two characters
+        memoize = (
+            limit == DEFAULT_LIMIT
+            and len(prefix) <= SHORT_PREFIX_LENGTH
+            and prefix.isascii()
+        )
+        if memoize and prefix in self.short_prefix_results:
+            return self.short_prefix_results[prefix]
+
+        start = bisect_left(self.keys, prefix)
+        # no character sorts after U+10FFFF
+        end = bisect_left(self.keys, prefix + "\U0010ffff", lo=start)
+        # entries are sorted by name, nlargest keeps the first among equal usages
+        results = heapq.nlargest(
+            limit, self.entries[start:end], key=lambda entry: entry[1]
+        )
+        if memoize:
+            self.short_prefix_results[prefix] = results
+        return results
+
+
+_indexes = {}
+_rebuilding = set()
+_lock = Lock()
+
+
+def build_index(kind, version):
+    get_usages = SUGGESTION_SOURCES[kind][0]
+    try:
+        index = PrefixIndex(get_usages(), version)
+        _indexes[kind] = index
+    finally:
+        with _lock:
+            _rebuilding.discard(kind)
+    return index
+
+
+def get_index(kind):
+    """
+    Return the index of kind, a stale index is rebuilt in the background at most
+    every SUGGEST_REFRESH_INTERVAL seconds and keeps serving meanwhile
+    """
+    version = tuple(cache_versions.get_versions(SUGGESTION_SOURCES[kind][1]))
+    index = _indexes.get(kind)
+    if index is None:
+        return build_index(kind, version)
+    if index.version == version:
+        return index
+
+    refresh_interval = getattr(settings, "SUGGEST_REFRESH_INTERVAL", 30)
+    if time.monotonic() - index.built_at < refresh_interval:
+        return index
+    with _lock:
+        if kind in _rebuilding:
+            return index
+        _rebuilding.add(kind)
+    background.schedule(build_index, kind, version)
+    return _indexes[kind]
+
+
+def get_suggestions(kind, prefix, limit):
+    return [
+        {"name": name, "usage": usage}
+        for name, usage in get_index(kind).search(prefix, limit)
+    ]
+
+
+def bump_suggestions_version():
+    cache_versions.bump_version_on_commit(SUGGESTIONS_VERSION)
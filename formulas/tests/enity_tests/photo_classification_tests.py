@@ -78,5 +78,15 @@ class PhotoClassificationTest(CrudTestBase, TestListViewMixin, TestRetrieveMixin
         results_pk_list = [item["pk"] for item in self.json_response["results"]]
         self.assertListEqual(pk_list, results_pk_list)
 
+    def test_cached_detail_follows_subject(self):
+        photo_classification = PhotoClassificationFactory.create()
+        self.shortcut_get(photo_classification.pk, status_code=status.HTTP_200_OK)
+
+        subject = photo_classification.subject
+        subject.name = "renamed"
+        subject.save()
+        self.shortcut_get(photo_classification.pk, status_code=status.HTTP_200_OK)
+        self.assertEqual("renamed", self.json_response["subject"])
+
 
 PhotoClassificationTest.__test__ = True
@@ -1,17 +1,28 @@
-from django.core.files.storage import default_storage
+import json
+import tempfile
+from base64 import urlsafe_b64encode
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection
 from django.test.utils import override_settings
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
 
 from core.tests import file_utils
 from core.tests.mixins import TestDetailViewMixin, TestListViewMixin
 from core.tests.test_utils import CrudTestBase
-from formulas import views
-from formulas.data_factories import PhotoFactory, generate_dict_factory
+from formulas import review_scores, storage_deletions, views
+from formulas.data_factories import PhotoFactory, TagFactory, generate_dict_factory
+from formulas.image_variants import THUMBNAIL_SIZE
 from formulas.models import (
     Photo,
     PhotoClassification,
     PhotoContext,
+    Review,
+    StorageDeletion,
     Subject,
     Tag,
     user_photos_directory_path,
@@ -109,6 +120,120 @@ class PhotoTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
             default_storage.exists(user_photos_directory_path(photo, filename))
         )
 
+    @override_settings(
+        DEFAULT_FILE_STORAGE="inmemorystorage.InMemoryStorage",
+        BACKGROUND_TASKS_SYNC=True,
+    )
+    def test_image_variants(self):
+        photo = PhotoFactory.create(file=None, user=self.get_owner_user())
+        created_file = file_utils.create_inmemory_image(
+            "wide.png", width=2000, height=1000
+        )
+        self.shortcut_patch(
+            photo.pk,
+            multipart=True,
+            data={"file": created_file},
+            token=self.get_owner_user_dict()["token"],
+            status_code=status.HTTP_200_OK,
+        )
+
+        photo.refresh_from_db()
+        first_variant_names = [photo.thumbnail.name, photo.preview.name]
+        self.assertTrue(photo.thumbnail.name.endswith("wide_thumbnail.webp"))
+        with Image.open(photo.thumbnail) as thumbnail:
+            self.assertEqual("WEBP", thumbnail.format)
+            self.assertEqual(THUMBNAIL_SIZE, thumbnail.size)
+        with Image.open(photo.preview) as preview:
+            self.assertEqual((1280, 640), preview.size)
+
+        self.shortcut_get(photo.pk, status_code=status.HTTP_200_OK)
+        self.assertTrue(self.json_response["thumbnail"].endswith(".webp"))
+
+        # a new file replaces the variants
+        self.shortcut_patch(
+            photo.pk,
+            multipart=True,
+            data={"file": file_utils.create_inmemory_image("other.png")},
+            token=self.get_owner_user_dict()["token"],
+            status_code=status.HTTP_200_OK,
+        )
+        photo.refresh_from_db()
+        self.assertTrue(photo.preview.name.endswith("other_preview.webp"))
+        for name in first_variant_names:
+            self.assertFalse(default_storage.exists(name))
+
+    def upload_photo(self, filename):
+        photo = PhotoFactory.create(file=None, user=self.get_owner_user())
+        photo.file.save(filename, file_utils.create_inmemory_image(filename))
+        return photo
+
+    @override_settings(
+        DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+        MEDIA_ROOT=tempfile.mkdtemp(),
+    )
+    def test_delete_files_after_commit(self):
+        photo = self.upload_photo("deleted.png")
+        file_name = photo.file.name
+        self.shortcut_delete(
+            photo.pk,
+            token=self.get_owner_user_dict()["token"],
+            status_code=status.HTTP_204_NO_CONTENT,
+        )
+        # the request doesn't wait for the storage
+        self.assertTrue(default_storage.exists(file_name))
+        self.assertTrue(StorageDeletion.objects.filter(name=file_name).exists())
+
+        self.assertEqual((1, 0), storage_deletions.drain_deletions())
+        self.assertFalse(default_storage.exists(file_name))
+        self.assertFalse(StorageDeletion.objects.exists())
+
+    @override_settings(
+        DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+        MEDIA_ROOT=tempfile.mkdtemp(),
+    )
+    def test_retry_failed_file_deletions(self):
+        photo = self.upload_photo("retried.png")
+        self.shortcut_patch(
+            photo.pk,
+            multipart=True,
+            data={"file": file_utils.create_inmemory_image("new.png")},
+            token=self.get_owner_user_dict()["token"],
+            status_code=status.HTTP_200_OK,
+        )
+        deletion = StorageDeletion.objects.get()
+
+        class UnavailableStorage(FileSystemStorage):
+            def delete(self, name):
+                raise OSError("storage unavailable")
+
+        self.assertEqual(
+            (0, 1), storage_deletions.drain_deletions(storage=UnavailableStorage())
+        )
+        deletion.refresh_from_db()
+        self.assertEqual(1, deletion.attempts)
+        self.assertIn("storage unavailable", deletion.last_error)
+        # not due until the retry delay passes
+        self.assertEqual((0, 0), storage_deletions.drain_deletions())
+
+        StorageDeletion.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual((1, 0), storage_deletions.drain_deletions())
+        self.assertFalse(default_storage.exists(deletion.name))
+
+    def test_claimed_file_deletions_are_leased(self):
+        storage_deletions.enqueue_deletion("claimed.png")
+        drained_meanwhile = []
+
+        class ConcurrentStorage(FileSystemStorage):
+            def delete(self, name):
+                # another worker finds nothing due while the storage answers
+                drained_meanwhile.append(storage_deletions.drain_deletions())
+
+        self.assertEqual(
+            (1, 0), storage_deletions.drain_deletions(storage=ConcurrentStorage())
+        )
+        self.assertListEqual([(0, 0)], drained_meanwhile)
+        self.assertFalse(StorageDeletion.objects.exists())
+
     @override_settings(DEFAULT_FILE_STORAGE="inmemorystorage.InMemoryStorage")
     def test_upload_big_photo(self):
         photo = PhotoFactory.create(file=None, user=self.get_owner_user())
@@ -182,6 +307,45 @@ class PhotoTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
             )
         )
 
+    def assert_classification_copied(self, photo_pk):
+        photo = Photo.objects.select_related("photo_classification").get(pk=photo_pk)
+        self.assertEqual(photo.photo_classification.subject_id, photo.subject_id)
+        self.assertEqual(photo.photo_classification.exam_number, photo.exam_number)
+
+    def test_classification_copies(self):
+        token = self.get_owner_user_dict()["token"]
+        self.shortcut_post(
+            data=self.get_data_for_post(),
+            token=token,
+            status_code=status.HTTP_201_CREATED,
+        )
+        photo_pk = self.json_response["pk"]
+        self.assert_classification_copied(photo_pk)
+
+        self.shortcut_patch(
+            photo_pk,
+            data={"photo_classification": {"subject": "physics", "exam_number": 6}},
+            token=token,
+            status_code=status.HTTP_200_OK,
+        )
+        self.assert_classification_copied(photo_pk)
+
+        classification = PhotoClassification.objects.get(photos__pk=photo_pk)
+        classification.subject = Subject.objects.create(name="chemistry")
+        classification.save()
+        self.assert_classification_copied(photo_pk)
+
+        # the filters use the copies, not the classification
+        query = {"subject": "chemistry", "exam_number": 6}
+        queries = self.capture_queries(
+            self.shortcut_get, query=query, status_code=status.HTTP_200_OK
+        )
+        self.assertEqual(
+            [photo_pk], [item["pk"] for item in self.json_response["results"]]
+        )
+        count_sql = next(q["sql"] for q in queries if "COUNT(" in q["sql"])
+        self.assertNotIn("JOIN", count_sql)
+
     def test_photo_classification_filter(self):
         def compare_cl(pc):
             return pc == photo_classification.pk
@@ -225,6 +389,53 @@ class PhotoTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
         self.assertEqual(p3.pk, self.json_response["results"][0]["pk"])
         self.assertEqual(1, self.json_response["count"])
 
+    def get_tag_ids(self, photo_pk):
+        return Photo.objects.values_list("tag_ids", flat=True).get(pk=photo_pk)
+
+    def test_tag_ids(self):
+        token = self.get_owner_user_dict()["token"]
+        self.shortcut_post(
+            data=self.get_data_for_post(),
+            token=token,
+            status_code=status.HTTP_201_CREATED,
+        )
+        photo_pk = self.json_response["pk"]
+        area, volumen = Tag.objects.get(name="area"), Tag.objects.get(name="volumen")
+        self.assertEqual(sorted([area.pk, volumen.pk]), self.get_tag_ids(photo_pk))
+
+        self.shortcut_patch(
+            photo_pk,
+            data={"tags": ["heat", "volumen"]},
+            token=token,
+            status_code=status.HTTP_200_OK,
+        )
+        heat = Tag.objects.get(name="heat")
+        self.assertEqual(sorted([volumen.pk, heat.pk]), self.get_tag_ids(photo_pk))
+
+        other = PhotoFactory.create(file=None, user=self.get_owner_user())
+        area.photos.add(other)
+        self.assertEqual([area.pk], self.get_tag_ids(other.pk))
+
+        query = [("tag_any", "area"), ("tag_any", "heat")]
+        queries = self.capture_queries(
+            self.shortcut_get, query=query, status_code=status.HTTP_200_OK
+        )
+        self.assertEqual(
+            {photo_pk, other.pk}, {item["pk"] for item in self.json_response["results"]}
+        )
+        count_sql = next(q["sql"] for q in queries if "COUNT(" in q["sql"])
+        self.assertIn("&&", count_sql)
+        self.assertNotIn("JOIN", count_sql)
+
+        query = [("tag", "heat"), ("tag", "volumen")]
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertEqual(
+            [photo_pk], [item["pk"] for item in self.json_response["results"]]
+        )
+
+        heat.delete()
+        self.assertEqual([volumen.pk], self.get_tag_ids(photo_pk))
+
     def test_search(self):
         photo1 = PhotoFactory.create(file=None, user=self.get_owner_user())
         photo1.name = "my custom name"
@@ -245,6 +456,34 @@ class PhotoTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
         self.assertEqual(photo2.pk, self.json_response["results"][0]["pk"])
         self.assertEqual(1, self.json_response["count"])
 
+    def test_search_similarity_rank(self):
+        close = PhotoFactory.create(
+            file=None, user=self.get_owner_user(), name="gauss law", description=""
+        )
+        far = PhotoFactory.create(
+            file=None,
+            user=self.get_owner_user(),
+            name="gauss law for magnetism and electric flux",
+            description="",
+        )
+        query = {"search": "gauss law", "rank": "similarity"}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        results_pk_list = [item["pk"] for item in self.json_response["results"]]
+        self.assertListEqual([close.pk, far.pk], results_pk_list)
+
+    def test_search_special_characters(self):
+        photo = PhotoFactory.create(
+            file=None, user=self.get_owner_user(), name="f(x) = x^2 [1+", description=""
+        )
+        # regex metacharacters used to make the regex search fail
+        for term in ("f(x)", "[1+", "x^2"):
+            self.shortcut_get(query={"search": term}, status_code=status.HTTP_200_OK)
+            self.assertEqual(photo.pk, self.json_response["results"][0]["pk"])
+
+        # like wildcards are escaped
+        self.shortcut_get(query={"search": "%"}, status_code=status.HTTP_200_OK)
+        self.assertEqual(0, self.json_response["count"])
+
     # and update ordering ?¿
     def test_created_ordering(self):
 
@@ -263,5 +502,375 @@ class PhotoTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
         results_pk_list = [item["pk"] for item in self.json_response["results"]]
         self.assertListEqual(pk_list, results_pk_list)
 
+    def test_cursor_pagination(self):
+        photos = PhotoFactory.create_batch(5, file=None, user=self.get_owner_user())
+        Photo.objects.filter(pk=photos[1].pk).update(total_reviews=8)
+        Photo.objects.filter(pk=photos[3].pk).update(total_reviews=3)
+
+        self.shortcut_get(query={"page_size": 5}, status_code=status.HTTP_200_OK)
+        expected_pk_list = [item["pk"] for item in self.json_response["results"]]
+        self.assertEqual(expected_pk_list[:2], [photos[1].pk, photos[3].pk])
+
+        query = {"pagination": "cursor", "page_size": 2}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertNotIn("count", self.json_response)
+        self.assertIsNone(self.json_response["previous"])
+        pk_list = [item["pk"] for item in self.json_response["results"]]
+        while self.json_response["next"]:
+            self.get(self.json_response["next"], **self.get_request_kwargs())
+            pk_list.extend(item["pk"] for item in self.json_response["results"])
+        self.assertListEqual(expected_pk_list, pk_list)
+
+        # walk back from the last page
+        pk_list = [item["pk"] for item in self.json_response["results"]]
+        while self.json_response["previous"]:
+            self.get(self.json_response["previous"], **self.get_request_kwargs())
+            page_pk_list = [item["pk"] for item in self.json_response["results"]]
+            pk_list = page_pk_list + pk_list
+        self.assertListEqual(expected_pk_list, pk_list)
+
+    def test_cursor_pagination_new_reviews_do_not_repeat_items(self):
+        photos = PhotoFactory.create_batch(4, file=None, user=self.get_owner_user())
+        query = {"pagination": "cursor", "page_size": 2}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        first_page = [item["pk"] for item in self.json_response["results"]]
+
+        # a new photo at the top must not shift the next page
+        PhotoFactory.create(file=None, user=self.get_owner_user())
+        self.get(self.json_response["next"], **self.get_request_kwargs())
+        second_page = [item["pk"] for item in self.json_response["results"]]
+        self.assertListEqual(
+            [photo.pk for photo in reversed(photos)], first_page + second_page
+        )
+
+        # a review moves a photo of the next page above the cursor, an offset
+        # would repeat the last photo of the first page
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        first_page = [item["pk"] for item in self.json_response["results"]]
+        self.assertEqual(photos[3].pk, first_page[-1])
+        review_scores.add_review_score(photos[2].pk, 5)
+        self.get(self.json_response["next"], **self.get_request_kwargs())
+        second_page = [item["pk"] for item in self.json_response["results"]]
+        self.assertListEqual([photos[1].pk, photos[0].pk], second_page)
+
+    def test_invalid_cursor(self):
+        query = {"cursor": "not-a-cursor"}
+        self.shortcut_get(query=query, status_code=status.HTTP_404_NOT_FOUND)
+
+        PhotoFactory.create(file=None, user=self.get_owner_user())
+        cursor = json.dumps({"p": [None, None, None, None]}).encode("utf-8")
+        query = {"cursor": urlsafe_b64encode(cursor).decode("ascii")}
+        self.shortcut_get(query=query, status_code=status.HTTP_404_NOT_FOUND)
+
+    def analyze_photos(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE formulas_photo")
+
+    def test_exact_count_below_threshold(self):
+        PhotoFactory.create_batch(3, file=None, user=self.get_owner_user())
+        self.analyze_photos()
+        self.shortcut_get(status_code=status.HTTP_200_OK)
+        self.assertEqual(self.json_response["count"], 3)
+        self.assertTrue(self.json_response["count_is_exact"])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=0)
+    def test_estimated_count(self):
+        PhotoFactory.create_batch(3, file=None, user=self.get_owner_user())
+        self.analyze_photos()
+
+        query = {"page_size": 2}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertFalse(self.json_response["count_is_exact"])
+        self.assertEqual(self.json_response["count"], 3)
+        self.assertEqual(len(self.json_response["results"]), 2)
+        self.assertIsNotNone(self.json_response["next"])
+
+        # pages beyond the estimate are still served
+        self.get(self.json_response["next"], **self.get_request_kwargs())
+        self.assertEqual(len(self.json_response["results"]), 1)
+        self.assertIsNone(self.json_response["next"])
+
+        # filtered lists use the planner estimate
+        query = {"page_size": 2, "user": self.get_owner_user().pk}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertFalse(self.json_response["count_is_exact"])
+
+        query = {"page_size": 2, "exact_count": "true"}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertTrue(self.json_response["count_is_exact"])
+        self.assertEqual(self.json_response["count"], 3)
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=0)
+    def test_estimated_count_empty_page(self):
+        PhotoFactory.create_batch(2, file=None, user=self.get_owner_user())
+        self.analyze_photos()
+        query = {"page": 5}
+        self.shortcut_get(query=query, status_code=status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_get_detail(self):
+        photo = PhotoFactory.create(file=None, user=self.get_owner_user())
+        self.shortcut_get(photo.pk, status_code=status.HTTP_200_OK)
+        etag = self.response["ETag"]
+        last_modified = self.response["Last-Modified"]
+
+        # user and validators, nothing is serialized
+        queries = self.capture_queries(
+            self.shortcut_get,
+            photo.pk,
+            HTTP_IF_NONE_MATCH=etag,
+            status_code=status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertEqual(2, len(queries))
+        self.assertEqual(etag, self.response["ETag"])
+        self.shortcut_get(
+            photo.pk,
+            HTTP_IF_MODIFIED_SINCE=last_modified,
+            status_code=status.HTTP_304_NOT_MODIFIED,
+        )
+
+        review_scores.add_review_score(photo.pk, 4)
+        self.shortcut_get(
+            photo.pk, HTTP_IF_NONE_MATCH=etag, status_code=status.HTTP_200_OK
+        )
+        self.assertNotEqual(etag, self.response["ETag"])
+
+    def patch_after_load(self, photo, data, concurrent_change, **kwargs):
+        """Run concurrent_change after PhotoDetail loads the photo to update"""
+        get_object = views.PhotoDetail.get_object
+
+        def get_object_then_change(view):
+            instance = get_object(view)
+            concurrent_change()
+            return instance
+
+        with mock.patch.object(views.PhotoDetail, "get_object", get_object_then_change):
+            self.shortcut_patch(
+                photo.pk,
+                data=data,
+                token=self.get_owner_user_dict()["token"],
+                status_code=status.HTTP_200_OK,
+                **kwargs,
+            )
+
+    def test_invalid_subject_type(self):
+        data = self.get_data_for_post()
+        data["photo_classification"]["subject"] = 5
+        self.shortcut_post(
+            data=data,
+            token=self.get_owner_user_dict()["token"],
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            ["Invalid value."], self.json_response["photo_classification"]["subject"]
+        )
+
+    def test_update_keeps_concurrent_review_scores(self):
+        photo = PhotoFactory.create(file=None, user=self.get_owner_user())
+        self.patch_after_load(
+            photo,
+            {"name": "renamed"},
+            lambda: review_scores.add_review_score(photo.pk, 5),
+        )
+        photo.refresh_from_db()
+        self.assertEqual("renamed", photo.name)
+        self.assertEqual(
+            (5, 1, 1), (photo.total_reviews, photo.review_count, photo.star_5_count)
+        )
+        self.assertIsNotNone(photo.last_reviewed_at)
+
+    def test_update_keeps_concurrent_image_variants(self):
+        photo = PhotoFactory.create(file=None, user=self.get_owner_user())
+        self.patch_after_load(
+            photo,
+            {"name": "renamed"},
+            lambda: Photo.objects.filter(pk=photo.pk).update(
+                thumbnail="x_thumb.webp", preview="x_preview.webp"
+            ),
+        )
+        photo.refresh_from_db()
+        self.assertEqual("renamed", photo.name)
+        self.assertEqual("x_thumb.webp", photo.thumbnail.name)
+        self.assertEqual("x_preview.webp", photo.preview.name)
+
+    def test_conditional_get_list(self):
+        photos = PhotoFactory.create_batch(2, file=None, user=self.get_owner_user())
+        self.shortcut_get(status_code=status.HTTP_200_OK)
+        etag = self.response["ETag"]
+        self.shortcut_get(
+            HTTP_IF_NONE_MATCH=etag, status_code=status.HTTP_304_NOT_MODIFIED
+        )
+
+        # other params, other results
+        self.shortcut_get(
+            query={"page_size": 1},
+            HTTP_IF_NONE_MATCH=etag,
+            status_code=status.HTTP_200_OK,
+        )
+
+        review_scores.add_review_score(photos[0].pk, 5)
+        self.shortcut_get(HTTP_IF_NONE_MATCH=etag, status_code=status.HTTP_200_OK)
+        etag = self.response["ETag"]
+
+        photos[1].delete()
+        self.shortcut_get(HTTP_IF_NONE_MATCH=etag, status_code=status.HTTP_200_OK)
+        self.assertEqual(1, self.json_response["count"])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=0)
+    def test_conditional_get_list_without_exact_count(self):
+        PhotoFactory.create_batch(3, file=None, user=self.get_owner_user())
+        self.analyze_photos()
+        # the estimated count skips the aggregate of the validators
+        queries = self.capture_queries(
+            self.shortcut_get, status_code=status.HTTP_200_OK
+        )
+        self.assertFalse(self.json_response["count_is_exact"])
+        self.assertNotIn("ETag", self.response)
+        self.assertFalse(any("MAX(" in query["sql"] for query in queries))
+
+        query = {"exact_count": "true"}
+        queries = self.capture_queries(
+            self.shortcut_get, query=query, status_code=status.HTTP_200_OK
+        )
+        self.assertEqual(3, self.json_response["count"])
+        self.assertIn("ETag", self.response)
+        # the count of the validators is the count of the page
+        self.assertEqual(1, sum("COUNT(" in query["sql"] for query in queries))
+
+        query = {"pagination": "cursor"}
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertNotIn("ETag", self.response)
+
+    def create_photos_with_tags(self, size):
+        tags = TagFactory.create_batch(2)
+        return PhotoFactory.create_batch(
+            size, file=None, user=self.get_owner_user(), tags=tags
+        )
+
+    def test_list_query_budget(self):
+        self.create_photos_with_tags(2)
+        query = {"page_size": 100}
+        # user, count estimate, validators with the count, photos page and tags
+        self.assert_query_budget(
+            lambda: self.shortcut_get(query=query, status_code=status.HTTP_200_OK),
+            lambda: self.create_photos_with_tags(10),
+            max_queries=5,
+        )
+        self.assertEqual(12, len(self.json_response["results"]))
+
+    def test_detail_query_budget(self):
+        photo = self.create_photos_with_tags(1)[0]
+        # user, validators, photo and tags
+        self.assert_query_budget(
+            lambda: self.shortcut_get(photo.pk, status_code=status.HTTP_200_OK),
+            lambda: photo.tags.add(*TagFactory.create_batch(3)),
+            max_queries=4,
+        )
+
+    def test_my_review(self):
+        photos = PhotoFactory.create_batch(2, file=None, user=self.get_owner_user())
+        reviewer = self.normal_users[1]
+        review = Review.objects.create(photo=photos[0], user=reviewer["user"], stars=4)
+        Review.objects.create(
+            photo=photos[0], user=self.normal_users[2]["user"], stars=1
+        )
+        review_scores.rebuild_scores(Photo.objects.all())
+
+        query = {"my_review": "true"}
+        self.shortcut_get(
+            query=query, token=reviewer["token"], status_code=status.HTTP_200_OK
+        )
+        my_reviews = {
+            item["pk"]: (item["review_count"], item["my_review"])
+            for item in self.json_response["results"]
+        }
+        self.assertDictEqual(
+            {
+                photos[0].pk: (2, {"pk": review.pk, "stars": 4}),
+                photos[1].pk: (0, None),
+            },
+            my_reviews,
+        )
+
+        self.shortcut_get(
+            photos[0].pk, token=reviewer["token"], status_code=status.HTTP_200_OK
+        )
+        self.assertNotIn("my_review", self.json_response)
+        self.get(
+            self.get_detail_url(photos[0].pk) + "?my_review=true",
+            token=reviewer["token"],
+            status_code=status.HTTP_200_OK,
+        )
+        self.assertEqual({"pk": review.pk, "stars": 4}, self.json_response["my_review"])
+
+        # the same url returns the review of each user
+        etag = self.response["ETag"]
+        self.get(
+            self.get_detail_url(photos[0].pk) + "?my_review=true",
+            token=self.normal_users[0]["token"],
+            HTTP_IF_NONE_MATCH=etag,
+            status_code=status.HTTP_200_OK,
+        )
+        self.assertIsNone(self.json_response["my_review"])
+
+    def test_my_review_query_budget(self):
+        reviewer = self.normal_users[1]
+
+        def create_reviewed_photos():
+            for photo in self.create_photos_with_tags(5):
+                Review.objects.create(photo=photo, user=reviewer["user"], stars=3)
+
+        create_reviewed_photos()
+        query = {"page_size": 100, "my_review": "true"}
+        # user, count estimate, validators with the count, photos page, tags
+        # and reviews
+        self.assert_query_budget(
+            lambda: self.shortcut_get(
+                query=query, token=reviewer["token"], status_code=status.HTTP_200_OK
+            ),
+            create_reviewed_photos,
+            max_queries=6,
+        )
+        self.assertTrue(
+            all(item["my_review"] for item in self.json_response["results"])
+        )
+
+    def test_filters_do_not_enumerate_tables(self):
+        photo = self.create_photos_with_tags(1)[0]
+        query = [
+            ("subject", photo.photo_classification.subject.name),
+            ("exam_number", photo.photo_classification.exam_number),
+            ("photo_classification", photo.photo_classification.pk),
+            ("user", self.get_owner_user().pk),
+            *[("tag", tag.name) for tag in photo.tags.all()],
+        ]
+
+        def send_request():
+            self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+
+        # user, tag names, count estimate, validators with the count, photos page
+        # and tags
+        self.assert_query_budget(
+            send_request, lambda: self.create_photos_with_tags(20), max_queries=6
+        )
+        queries = self.capture_queries(send_request)
+        self.assertFalse(any("DISTINCT" in query["sql"] for query in queries))
+
+    def test_filters_validate_types(self):
+        self.shortcut_get(query={"user": "me"}, status_code=status.HTTP_400_BAD_REQUEST)
+        self.shortcut_get(
+            query={"exam_number": 9}, status_code=status.HTTP_400_BAD_REQUEST
+        )
+        self.shortcut_get(
+            query={"photo_classification": -1},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_unknown_tag_filter(self):
+        t1 = Tag.objects.create(name="volume")
+        PhotoFactory.create(file=None, user=self.get_owner_user(), tags=(t1,))
+        query = [("tag", t1.name), ("tag", "unknown")]
+        self.shortcut_get(query=query, status_code=status.HTTP_200_OK)
+        self.assertEqual(0, self.json_response["count"])
+
 
 PhotoTest.__test__ = True
@@ -1,11 +1,17 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.urls import reverse
 from rest_framework import status
 
 from core.tests.mixins import TestDetailViewMixin, TestListViewMixin
 from core.tests.test_utils import CrudTestBase
-from formulas import views
+from formulas import review_scores, views
 from formulas.data_factories import PhotoFactory, ReviewFactory
-from formulas.models import Review
+from formulas.models import Photo, Review
 
 
 class ReviewTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
@@ -118,5 +124,241 @@ class ReviewTest(CrudTestBase, TestListViewMixin, TestDetailViewMixin):
         results_pk_list = [item["pk"] for item in self.json_response["results"]]
         self.assertListEqual(pk_list, results_pk_list)
 
+    def assert_photo_scores(self, photo, total_reviews, review_count, star_counts):
+        photo = Photo.objects.get(pk=photo.pk)
+        self.assertEqual(total_reviews, photo.total_reviews)
+        self.assertEqual(review_count, photo.review_count)
+        for stars, count in star_counts.items():
+            self.assertEqual(count, getattr(photo, "star_%d_count" % stars))
+
+    def test_review_scores(self):
+        photo = self.photos[0]
+        token = self.normal_users[1]["token"]
+        data = {"stars": 4, "photo": photo.pk}
+
+        self.shortcut_post(data=data, token=token, status_code=status.HTTP_201_CREATED)
+        review_pk = self.json_response["pk"]
+        self.assert_photo_scores(photo, 4, 1, {4: 1})
+
+        self.shortcut_patch(
+            review_pk, data={"stars": 2}, token=token, status_code=status.HTTP_200_OK
+        )
+        self.assert_photo_scores(photo, 2, 1, {2: 1, 4: 0})
+
+        # moving the review to another photo moves its score
+        self.shortcut_patch(
+            review_pk,
+            data={"photo": self.photos[1].pk},
+            token=token,
+            status_code=status.HTTP_200_OK,
+        )
+        self.assert_photo_scores(photo, 0, 0, {2: 0})
+        self.assert_photo_scores(self.photos[1], 2, 1, {2: 1})
+
+        self.shortcut_delete(
+            review_pk, token=token, status_code=status.HTTP_204_NO_CONTENT
+        )
+        self.assert_photo_scores(self.photos[1], 0, 0, {2: 0})
+
+    def test_delete_after_concurrent_update(self):
+        photo = self.photos[0]
+        review = ReviewFactory.create(
+            photo=photo, user=self.normal_users[1]["user"], stars=4
+        )
+        review_scores.add_review_score(photo.pk, 4)
+        get_object = views.ReviewDetail.get_object
+
+        def get_object_then_update(view):
+            instance = get_object(view)
+            # another request changes the stars of the loaded review
+            Review.objects.filter(pk=review.pk).update(stars=2)
+            review_scores.change_review_score(photo.pk, 4, photo.pk, 2)
+            return instance
+
+        with mock.patch.object(
+            views.ReviewDetail, "get_object", get_object_then_update
+        ):
+            self.shortcut_delete(
+                review.pk,
+                token=self.normal_users[1]["token"],
+                status_code=status.HTTP_204_NO_CONTENT,
+            )
+        self.assert_photo_scores(photo, 0, 0, {2: 0, 4: 0})
+
+    def test_delete_reviewer(self):
+        reviewer = self.normal_users[1]["user"]
+        for photo, stars in ((self.photos[0], 4), (self.photos[1], 2)):
+            self.shortcut_post(
+                data={"photo": photo.pk, "stars": stars},
+                token=self.normal_users[1]["token"],
+                status_code=status.HTTP_201_CREATED,
+            )
+        self.shortcut_post(
+            data={"photo": self.photos[0].pk, "stars": 5},
+            token=self.normal_users[2]["token"],
+            status_code=status.HTTP_201_CREATED,
+        )
+
+        # a queryset delete like the admin one, the test users are shared
+        get_user_model().objects.filter(pk=reviewer.pk).delete()
+        self.assert_photo_scores(self.photos[0], 5, 1, {4: 0, 5: 1})
+        self.assert_photo_scores(self.photos[1], 0, 0, {2: 0})
+        self.assertListEqual(
+            [], review_scores.find_outdated_scores(Photo.objects.all())
+        )
+
+    def test_create_queries(self):
+        data = {"stars": 4, "photo": self.photos[0].pk}
+        queries = self.capture_queries(
+            self.shortcut_post,
+            data=data,
+            token=self.normal_users[1]["token"],
+            status_code=status.HTTP_201_CREATED,
+        )
+        # user, photo owner, insert and counters update
+        queries = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(4, len(queries))
+        photo_lookup = queries[1]
+        self.assertIn('FROM "formulas_photo"', photo_lookup)
+        self.assertNotIn("ORDER BY", photo_lookup)
+        self.assertNotIn("total_reviews", photo_lookup)
+        for sql in queries:
+            self.assertNotIn("SUM(", sql)
+            self.assertNotIn("COUNT(", sql)
+
+    def test_duplicated_review_keeps_scores(self):
+        self.test_one_review_per_photo()
+        self.assert_photo_scores(self.photos[0], 0, 0, {})
+
+    def test_rebuild_review_scores_command(self):
+        photo = self.photos[0]
+        ReviewFactory.create(photo=photo, user=self.normal_users[1]["user"], stars=5)
+        ReviewFactory.create(photo=photo, user=self.normal_users[2]["user"], stars=3)
+
+        # reviews created outside of the API leave the counters outdated
+        with self.assertRaises(CommandError):
+            call_command("rebuild_review_scores", "--check", stdout=StringIO())
+
+        call_command("rebuild_review_scores", stdout=StringIO())
+        self.assert_photo_scores(photo, 8, 2, {3: 1, 5: 1})
+        call_command("rebuild_review_scores", "--check", stdout=StringIO())
+
+    def upsert(self, data, status_code, user_index=1):
+        self.put(
+            reverse(views.ReviewUpsert.name),
+            data=data,
+            token=self.normal_users[user_index]["token"],
+            status_code=status_code,
+        )
+        return self.json_response
+
+    def test_upsert(self):
+        photo = self.photos[0]
+        data = {"photo": photo.pk, "stars": 4}
+        review = self.upsert(data, status.HTTP_201_CREATED)
+        self.assertTrue(review["created"])
+        self.assertEqual(self.normal_users[1]["user"].pk, review["user"])
+        self.assert_photo_scores(photo, 4, 1, {4: 1})
+
+        # repeating the request changes nothing
+        self.assertFalse(self.upsert(data, status.HTTP_200_OK)["created"])
+        self.assert_photo_scores(photo, 4, 1, {4: 1})
+
+        data["stars"] = 2
+        self.assertEqual(review["pk"], self.upsert(data, status.HTTP_200_OK)["pk"])
+        self.assertEqual(2, Review.objects.get(pk=review["pk"]).stars)
+        self.assert_photo_scores(photo, 2, 1, {2: 1, 4: 0})
+
+        # user, lock of the current review, upsert with the owner check and scores
+        queries = self.capture_queries(
+            self.upsert, data, status.HTTP_201_CREATED, user_index=2
+        )
+        queries = [q["sql"] for q in queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(4, len(queries))
+        self.assertIn("ON CONFLICT", queries[2])
+
+    def test_upsert_batch(self):
+        ReviewFactory.create(
+            photo=self.photos[0], user=self.normal_users[1]["user"], stars=1
+        )
+        Photo.objects.filter(pk=self.photos[0].pk).update(
+            total_reviews=1, review_count=1, star_1_count=1
+        )
+        data = [
+            {"photo": self.photos[1].pk, "stars": 5},
+            {"photo": self.photos[0].pk, "stars": 3},
+        ]
+        queries = self.capture_queries(self.upsert, data, status.HTTP_200_OK)
+        reviews = self.json_response
+        # the photos are locked in pk order, the results follow the request
+        updated_pks = [
+            int(q["sql"].rsplit("= ", 1)[1])
+            for q in queries
+            if q["sql"].startswith('UPDATE "formulas_photo"')
+        ]
+        self.assertEqual(3, len(updated_pks))
+        self.assertListEqual(sorted(updated_pks), updated_pks)
+        self.assertListEqual(
+            [(self.photos[1].pk, 5, True), (self.photos[0].pk, 3, False)],
+            [
+                (review["photo"], review["stars"], review["created"])
+                for review in reviews
+            ],
+        )
+        self.assert_photo_scores(self.photos[0], 3, 1, {1: 0, 3: 1})
+        self.assert_photo_scores(self.photos[1], 5, 1, {5: 1})
+
+    def test_upsert_errors(self):
+        missing_pk = Photo.objects.order_by("-pk").first().pk + 1
+        data = [
+            {"photo": self.photos[1].pk, "stars": 5},
+            {"photo": missing_pk, "stars": 3},
+        ]
+        errors = self.upsert(data, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual({}, errors[0])
+        self.assertIn(str(missing_pk), errors[1]["photo"][0])
+        # none of the reviews is saved
+        self.assertFalse(Review.objects.exists())
+        self.assert_photo_scores(self.photos[1], 0, 0, {5: 0})
+
+        # photo owner
+        self.upsert(
+            {"photo": self.photos[0].pk, "stars": 5},
+            status.HTTP_400_BAD_REQUEST,
+            user_index=0,
+        )
+        self.assertEqual(
+            ["Photo owner cannot make a review"], self.json_response["photo"]
+        )
+
+        self.upsert([], status.HTTP_400_BAD_REQUEST)
+        duplicated = [{"photo": self.photos[1].pk, "stars": stars} for stars in (1, 2)]
+        self.upsert(duplicated, status.HTTP_400_BAD_REQUEST)
+        self.upsert(
+            {"photo": self.photos[1].pk, "stars": 6}, status.HTTP_400_BAD_REQUEST
+        )
+        # out of the integer range of the pks
+        self.upsert({"photo": 2 ** 31, "stars": 3}, status.HTTP_400_BAD_REQUEST)
+
+    def test_photos_ordered_by_score(self):
+        token = self.normal_users[1]["token"]
+        self.shortcut_post(
+            data={"stars": 1, "photo": self.photos[0].pk},
+            token=token,
+            status_code=status.HTTP_201_CREATED,
+        )
+        self.shortcut_post(
+            data={"stars": 5, "photo": self.photos[1].pk},
+            token=token,
+            status_code=status.HTTP_201_CREATED,
+        )
+        self.get(
+            reverse(views.PhotoList.name), token=token, status_code=status.HTTP_200_OK
+        )
+        results_pk_list = [item["pk"] for item in self.json_response["results"]]
+        self.assertListEqual(
+            [self.photos[1].pk, self.photos[0].pk, self.photos[2].pk], results_pk_list
+        )
+
 
 ReviewTest.__test__ = True
@@ -65,5 +65,29 @@ class SubjectTest(CrudTestBase, TestListViewMixin, TestRetrieveMixin):
         self.assertEqual(s.pk, self.json_response["results"][0]["pk"])
         self.assertEqual(1, self.json_response["count"])
 
+    def test_cached_list(self):
+        SubjectFactory.create(name="physics")
+        self.shortcut_get(status_code=status.HTTP_200_OK)
+        self.assertEqual(1, self.json_response["count"])
+
+        # only the user is queried
+        queries = self.capture_queries(
+            self.shortcut_get, status_code=status.HTTP_200_OK
+        )
+        self.assertEqual(1, len(queries))
+        self.assertEqual(1, self.json_response["count"])
+
+        # a saved subject invalidates the cached responses
+        subject = SubjectFactory.create(name="calculus")
+        self.shortcut_get(status_code=status.HTTP_200_OK)
+        self.assertEqual(2, self.json_response["count"])
+
+        subject_pk = subject.pk
+        self.shortcut_get(subject_pk, status_code=status.HTTP_200_OK)
+        subject.delete()
+        self.shortcut_get(subject_pk, status_code=status.HTTP_404_NOT_FOUND)
+        self.shortcut_get(status_code=status.HTTP_200_OK)
+        self.assertEqual(1, self.json_response["count"])
+
 
 SubjectTest.__test__ = True
@@ -0,0 +1,126 @@
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.test.testcases import TestCase
+from django.urls.base import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.tests.test_utils import TestApiBase
+from formulas import query_views, views
+from formulas.data_factories import PhotoFactory, TagFactory
+from formulas.models import PhotoClassification, PhotoContext, Subject
+
+
+class FacetsTest(TestApiBase, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "root", "root1234", "secret1234"
+        )
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+        cls.subject = Subject.objects.create(name="calculus")
+        cls.exam1 = PhotoClassification.objects.create(
+            subject=cls.subject, exam_number=1
+        )
+        cls.exam2 = PhotoClassification.objects.create(
+            subject=cls.subject, exam_number=2
+        )
+        cls.area, cls.volume = TagFactory.create(name="area"), TagFactory.create(
+            name="volume"
+        )
+
+    def setUp(self):
+        self.init()
+
+    def create_photo(self, photo_classification, tags=(), formula_type=None, **kwargs):
+        photo_context = None
+        if formula_type is not None:
+            photo_context = PhotoContext.objects.create(formula_type=formula_type)
+        return PhotoFactory.create(
+            file=None,
+            user=self.user,
+            photo_classification=photo_classification,
+            photo_context=photo_context,
+            tags=tags,
+            **kwargs
+        )
+
+    def get_facets(self, subject="calculus", **query):
+        url = reverse(query_views.FacetsView.name, args=[subject])
+        if query:
+            url += "?" + urlencode(query)
+        self.get(url, token=self.token, status_code=status.HTTP_200_OK)
+        return self.json_response
+
+    def test_facets(self):
+        one_formula = PhotoContext.FormulaType.ONE_FORMULA
+        self.create_photo(
+            self.exam1, [self.area, self.volume], one_formula, name="integral area"
+        )
+        self.create_photo(self.exam1, [self.area], one_formula)
+        self.create_photo(self.exam2, [], PhotoContext.FormulaType.MULTIPLE_FORMULAS)
+        self.create_photo(self.exam2)
+        other_subject = PhotoClassification.objects.create(
+            subject=Subject.objects.create(name="physics"), exam_number=1
+        )
+        self.create_photo(other_subject, [self.volume])
+
+        self.assertDictEqual(
+            {
+                "count": 4,
+                "tag": [{"value": "area", "count": 2}, {"value": "volume", "count": 1}],
+                "exam_number": [
+                    {"value": 1, "count": 2},
+                    {"value": 2, "count": 2},
+                ],
+                "formula_type": [
+                    {"value": "F1", "count": 2},
+                    {"value": "FM", "count": 1},
+                ],
+            },
+            self.get_facets(),
+        )
+
+        self.assertDictEqual(
+            {
+                "count": 1,
+                "tag": [{"value": "area", "count": 1}, {"value": "volume", "count": 1}],
+                "exam_number": [{"value": 1, "count": 1}],
+                "formula_type": [{"value": "F1", "count": 1}],
+            },
+            self.get_facets(search="integral"),
+        )
+
+        self.assertDictEqual(
+            {"count": 0, "tag": [], "exam_number": [], "formula_type": []},
+            self.get_facets("algebra"),
+        )
+
+    def test_cached_facets(self):
+        photo = self.create_photo(self.exam1, [self.area])
+        self.assertEqual(1, self.get_facets()["count"])
+        # only the user is queried
+        queries = self.capture_queries(self.get_facets)
+        self.assertEqual(1, len(queries))
+        self.assertEqual(1, self.json_response["count"])
+
+        # changes of the photos and their tags invalidate the cached counts
+        self.create_photo(self.exam2)
+        self.assertEqual(2, self.get_facets()["count"])
+        photo.tags.add(self.volume)
+        self.assertEqual(2, len(self.get_facets()["tag"]))
+        self.delete(
+            reverse(views.PhotoDetail.name, args=[photo.pk]),
+            token=self.token,
+            status_code=status.HTTP_204_NO_CONTENT,
+        )
+        self.assertDictEqual(
+            {
+                "count": 1,
+                "tag": [],
+                "exam_number": [{"value": 2, "count": 1}],
+                "formula_type": [],
+            },
+            self.get_facets(),
+        )
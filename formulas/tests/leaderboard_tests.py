@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django.urls.base import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.tests.test_utils import TestApiBase
+from formulas import leaderboards, query_views, review_scores, views
+from formulas.data_factories import PhotoFactory, TagFactory, UserFactory
+from formulas.models import LeaderboardEntry, PhotoClassification, Review, Subject
+
+
+@override_settings(BACKGROUND_TASKS_SYNC=True)
+class LeaderboardTest(TestApiBase, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_superuser(
+            "root", "root1234", "secret1234"
+        )
+        cls.user = user
+        cls.token = str(RefreshToken.for_user(user).access_token)
+        cls.subject = Subject.objects.create(name="calculus")
+        cls.exam1 = PhotoClassification.objects.create(
+            subject=cls.subject, exam_number=1
+        )
+        cls.exam2 = PhotoClassification.objects.create(
+            subject=cls.subject, exam_number=2
+        )
+
+    def setUp(self):
+        self.init()
+
+    def get_leaderboard(self, *args):
+        url = reverse(query_views.LeaderboardView.name, args=(self.subject.name, *args))
+        self.get(url, token=self.token, status_code=status.HTTP_200_OK)
+        return [(item["photo"]["pk"], item["score"]) for item in self.json_response]
+
+    def create_photo(self, photo_classification, stars=()):
+        photo = PhotoFactory.create(
+            file=None, user=self.user, photo_classification=photo_classification
+        )
+        for star in stars:
+            review_scores.add_review_score(photo.pk, star)
+        return photo
+
+    def test_leaderboards(self):
+        low = self.create_photo(self.exam1, [2])
+        high = self.create_photo(self.exam1, [5, 4])
+        other_exam = self.create_photo(self.exam2, [5])
+        leaderboards.refresh_leaderboards()
+
+        self.assertListEqual([(high.pk, 9), (low.pk, 2)], self.get_leaderboard(1))
+        self.assertListEqual([(other_exam.pk, 5)], self.get_leaderboard(2))
+        self.assertListEqual(
+            [(high.pk, 9), (other_exam.pk, 5), (low.pk, 2)], self.get_leaderboard()
+        )
+        self.assertEqual([1, 2, 3], [item["position"] for item in self.json_response])
+
+    def test_incremental_refresh(self):
+        photos = [
+            self.create_photo(self.exam1, [1])
+            for _ in range(leaderboards.LEADERBOARD_SIZE)
+        ]
+        leaderboards.refresh_leaderboards()
+        outsider = self.create_photo(self.exam1)
+        self.assertNotIn(outsider.pk, dict(self.get_leaderboard(1)))
+
+        # a review moves the photo to the top
+        review_user = UserFactory.create()
+        Review.objects.create(photo=outsider, user=review_user, stars=5)
+        review_scores.add_review_score(outsider.pk, 5)
+        self.assertEqual((outsider.pk, 5), self.get_leaderboard(1)[0])
+        self.assertEqual((outsider.pk, 5), self.get_leaderboard()[0])
+        self.assertEqual(leaderboards.LEADERBOARD_SIZE, len(self.get_leaderboard(1)))
+
+        # a deleted photo leaves room for the next one
+        deleted_pk = photos[-1].pk
+        self.assertIn(deleted_pk, dict(self.get_leaderboard(1)))
+        self.delete(
+            reverse(views.PhotoDetail.name, args=[deleted_pk]),
+            token=self.token,
+            status_code=status.HTTP_204_NO_CONTENT,
+        )
+        leaderboard = dict(self.get_leaderboard(1))
+        self.assertNotIn(deleted_pk, leaderboard)
+        self.assertIn(photos[0].pk, leaderboard)
+        self.assertEqual(leaderboards.LEADERBOARD_SIZE, len(leaderboard))
+
+        # the full rebuild agrees with the incremental refreshes
+        incremental = list(LeaderboardEntry.objects.values_list("photo_id", "score"))
+        call_command("rebuild_leaderboards", stdout=StringIO())
+        rebuilt = list(LeaderboardEntry.objects.values_list("photo_id", "score"))
+        self.assertCountEqual(incremental, rebuilt)
+
+    def test_query_budget(self):
+        def create_photos():
+            for stars in range(1, 6):
+                photo = self.create_photo(self.exam1, [stars])
+                photo.tags.add(*TagFactory.create_batch(2))
+
+        create_photos()
+        # user, entries with their photos and tags
+        self.assert_query_budget(
+            lambda: self.get_leaderboard(1), create_photos, max_queries=3
+        )
+        self.assertEqual(leaderboards.LEADERBOARD_SIZE, len(self.json_response))
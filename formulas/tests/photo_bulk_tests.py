@@ -0,0 +1,182 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test.testcases import TestCase
+from django.test.utils import override_settings
+from django.urls.base import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.tests import file_utils
+from core.tests.test_utils import TestApiBase
+from formulas import views
+from formulas.models import (
+    Photo,
+    PhotoClassification,
+    PhotoContext,
+    Subject,
+    Tag,
+    user_photos_directory_path,
+)
+from formulas.serializers import MAX_BULK_PHOTOS
+
+
+class PhotoBulkCreateTest(TestApiBase, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            "student", "student@example.com", "secret1234"
+        )
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+        cls.subject = Subject.objects.create(name="physics")
+
+    def setUp(self):
+        self.init()
+        self.url = reverse(views.PhotoBulkCreate.name)
+
+    def get_photo_data(self, number, subject="physics", exam_number=1, tags=None):
+        data = {
+            "name": "formula {0}".format(number),
+            "description": "exam formula",
+            "photo_classification": {"subject": subject, "exam_number": exam_number},
+            "tags": tags if tags is not None else ["area", "volume"],
+        }
+        if number % 2:
+            data["photo_context"] = {"formula_type": "F1", "professor": "Anna"}
+        return data
+
+    def test_create(self):
+        data = [
+            self.get_photo_data(0),
+            self.get_photo_data(1, subject="calculus", exam_number=2),
+            self.get_photo_data(2, tags=["area", "area", "new-tag"]),
+        ]
+        self.post(
+            self.url, data=data, token=self.token, status_code=status.HTTP_201_CREATED
+        )
+
+        self.assertListEqual(
+            [item["name"] for item in data],
+            [item["name"] for item in self.json_response],
+        )
+        self.assertEqual(3, Photo.objects.filter(user=self.user).count())
+        self.assertTrue(Subject.objects.filter(name="calculus").exists())
+        self.assertEqual(2, PhotoClassification.objects.count())
+        self.assertEqual(1, PhotoContext.objects.count())
+        self.assertEqual(3, Tag.objects.count())
+
+        item = self.json_response[1]
+        self.assertEqual("calculus", item["photo_classification"]["subject"])
+        self.assertEqual(2, item["photo_classification"]["exam_number"])
+        self.assertEqual("Anna", item["photo_context"]["professor"])
+        self.assertEqual(self.user.pk, item["user"])
+        self.assertCountEqual(["area", "new-tag"], self.json_response[2]["tags"])
+        self.assertEqual(
+            sorted(
+                Tag.objects.filter(name__in=["area", "new-tag"]).values_list(
+                    "pk", flat=True
+                )
+            ),
+            Photo.objects.get(pk=self.json_response[2]["pk"]).tag_ids,
+        )
+
+    @override_settings(DEFAULT_FILE_STORAGE="inmemorystorage.InMemoryStorage")
+    def test_create_multipart_with_files(self):
+        data = [self.get_photo_data(0), self.get_photo_data(1)]
+        self.post(
+            self.url,
+            data={
+                "photos": json.dumps(data),
+                "file_1": file_utils.create_inmemory_image("second.png"),
+            },
+            multipart=True,
+            token=self.token,
+            status_code=status.HTTP_201_CREATED,
+        )
+        self.assertIsNone(self.json_response[0]["file"])
+        photo = Photo.objects.get(pk=self.json_response[1]["pk"])
+        self.assertTrue(
+            default_storage.exists(user_photos_directory_path(photo, "second.png"))
+        )
+
+    def test_errors_per_item(self):
+        data = [
+            self.get_photo_data(0),
+            self.get_photo_data(1, subject="some%+weird"),
+            self.get_photo_data(2, exam_number=9),
+        ]
+        self.post(
+            self.url,
+            data=data,
+            token=self.token,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(3, len(self.json_response))
+        self.assertDictEqual({}, self.json_response[0])
+        self.assertIn("subject", self.json_response[1]["photo_classification"])
+        self.assertIn("exam_number", self.json_response[2]["photo_classification"])
+        # nothing is created when a photo is invalid
+        self.assertFalse(Photo.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_invalid_payloads(self):
+        self.post(
+            self.url,
+            data={"photos": "not json"},
+            multipart=True,
+            token=self.token,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+        self.post(
+            self.url, data=[], token=self.token, status_code=status.HTTP_400_BAD_REQUEST
+        )
+        data = [self.get_photo_data(number) for number in range(MAX_BULK_PHOTOS + 1)]
+        self.post(
+            self.url,
+            data=data,
+            token=self.token,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_classifications_inserted_in_order(self):
+        data = [
+            self.get_photo_data(number, exam_number=exam_number)
+            for number, exam_number in enumerate((5, 2, 4, 1, 3))
+        ]
+        queries = self.capture_queries(
+            self.post,
+            self.url,
+            data=data,
+            token=self.token,
+            status_code=status.HTTP_201_CREATED,
+        )
+        insert = next(
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('INSERT INTO "formulas_photoclassification"')
+        )
+        exam_numbers = [
+            int(exam_number)
+            for exam_number in re.findall(r"\(\d+, (\d+)\)", insert.split("VALUES")[1])
+        ]
+        self.assertListEqual([1, 2, 3, 4, 5], exam_numbers)
+
+    def test_query_budget(self):
+        def send_request(size):
+            data = [
+                self.get_photo_data(
+                    number, exam_number=number % 6 + 1, tags=["tag-%d" % number]
+                )
+                for number in range(size)
+            ]
+            return self.capture_queries(
+                self.post,
+                self.url,
+                data=data,
+                token=self.token,
+                status_code=status.HTTP_201_CREATED,
+            )
+
+        self.assertEqual(len(send_request(2)), len(send_request(30)))
@@ -8,7 +8,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from core.tests.test_utils import TestApiBase
 from formulas import query_views
-from formulas.data_factories import PhotoFactory
+from formulas.data_factories import PhotoFactory, TagFactory
 from formulas.models import Photo, PhotoClassification, Subject
 
 # url with slufigy
@@ -110,3 +110,186 @@ class PhotoFullSearchTest(TestApiBase, TestCase):
         )
         self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
         self.assertEqual(2, self.json_response["count"])
+
+    def test_search_query_budget(self):
+        def create_photos():
+            PhotoFactory.create_batch(
+                5,
+                name="Ohm law",
+                file=None,
+                user=self.super_user["user"],
+                photo_classification=self.photo_classification2,
+                tags=TagFactory.create_batch(2),
+            )
+
+        create_photos()
+        url = self.get_url(
+            args=(self.subject2.name,), search_querys={"search": "ohm", "page_size": 50}
+        )
+        # user, count estimate, count, photos page and tags
+        self.assert_query_budget(
+            lambda: self.get(
+                url, token=self.super_user["token"], status_code=status.HTTP_200_OK
+            ),
+            create_photos,
+            max_queries=5,
+        )
+        self.assertEqual(10, len(self.json_response["results"]))
+
+    def test_relevance_ordering(self):
+        description_match = Photo.objects.create(
+            name="Electric potential",
+            description="Work needed to move a charge",
+            user=self.super_user["user"],
+            photo_classification=self.photo_classification2,
+        )
+        name_match = Photo.objects.create(
+            name="Charge density",
+            description="Amount of electric charge per unit of volume",
+            user=self.super_user["user"],
+            photo_classification=self.photo_classification2,
+        )
+        url = self.get_url(
+            args=(self.subject2.name,),
+            search_querys={"search": "charge", "ordering": "relevance"},
+        )
+        self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
+        results = self.json_response["results"]
+        self.assertListEqual(
+            [name_match.pk, description_match.pk], [item["pk"] for item in results]
+        )
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+        self.assertIn("<mark>charge</mark>", results[0]["headline"])
+        self.assertIn("<mark>charge</mark>", results[1]["headline"])
+
+        # without relevance ordering newer photos appear first
+        url = self.get_url(
+            args=(self.subject2.name,), search_querys={"search": "charge"}
+        )
+        self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
+        self.assertNotIn("headline", self.json_response["results"][0])
+
+    def test_headline_escapes_html(self):
+        Photo.objects.create(
+            name="Charge",
+            description="<script>alert(1)</script> charge & <b>current</b>",
+            user=self.super_user["user"],
+            photo_classification=self.photo_classification2,
+        )
+        url = self.get_url(
+            args=(self.subject2.name,),
+            search_querys={"search": "charge", "ordering": "relevance"},
+        )
+        self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
+        headline = self.json_response["results"][0]["headline"]
+        self.assertIn("<mark>charge</mark>", headline)
+        self.assertIn("&lt;b&gt;current&lt;/b&gt;", headline)
+        self.assertIn("&amp;", headline)
+        self.assertNotIn("<script>", headline)
+        self.assertNotIn("<b>", headline)
+
+    def test_relevance_query_budget(self):
+        def create_photos():
+            PhotoFactory.create_batch(
+                5,
+                name="Ohm law",
+                file=None,
+                user=self.super_user["user"],
+                photo_classification=self.photo_classification2,
+                tags=TagFactory.create_batch(2),
+            )
+
+        create_photos()
+        url = self.get_url(
+            args=(self.subject2.name,),
+            search_querys={"search": "ohm", "ordering": "relevance", "page_size": 50},
+        )
+        # user, count estimate, count, photos page, tags and headlines
+        self.assert_query_budget(
+            lambda: self.get(
+                url, token=self.super_user["token"], status_code=status.HTTP_200_OK
+            ),
+            create_photos,
+            max_queries=6,
+        )
+
+    def search_pks(self, term):
+        url = self.get_url(args=(self.subject2.name,), search_querys={"search": term})
+        self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
+        return [item["pk"] for item in self.json_response["results"]]
+
+    def test_search_document(self):
+        tag = TagFactory.create(name="electromagnetism")
+        photo = PhotoFactory.create(
+            name="Faraday law",
+            description="Induced voltage",
+            file=None,
+            user=self.super_user["user"],
+            photo_classification=self.photo_classification2,
+            photo_context__professor="Maxwell",
+            tags=[tag],
+        )
+        for term in ("faraday", "electromagnetism", "maxwell", "physics"):
+            self.assertEqual([photo.pk], self.search_pks(term))
+
+        # the document follows the changes of the related rows
+        tag.name = "induction"
+        tag.save()
+        photo.photo_context.professor = "Lenz"
+        photo.photo_context.save()
+        self.assertEqual([], self.search_pks("electromagnetism"))
+        self.assertEqual([photo.pk], self.search_pks("induction"))
+        self.assertEqual([photo.pk], self.search_pks("lenz"))
+
+        photo.tags.clear()
+        self.assertEqual([], self.search_pks("induction"))
+
+        # the name weighs more than the tags and the professor
+        PhotoFactory.create(
+            name="Lenz law",
+            file=None,
+            user=self.super_user["user"],
+            photo_classification=self.photo_classification2,
+        )
+        url = self.get_url(
+            args=(self.subject2.name,),
+            search_querys={"search": "lenz", "ordering": "relevance"},
+        )
+        self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
+        results = self.json_response["results"]
+        self.assertEqual(photo.pk, results[1]["pk"])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+    def test_search_syntax(self):
+        def create_photo(name):
+            return PhotoFactory.create(
+                name=name,
+                description="",
+                file=None,
+                user=self.super_user["user"],
+                photo_classification=self.photo_classification2,
+                photo_context=None,
+            )
+
+        ohm = create_photo("Ohm law voltage")
+        kirchhoff = create_photo("Kirchhoff voltage law")
+        coulomb = create_photo("Coulomb law")
+
+        cases = [
+            ("voltage law", {ohm.pk, kirchhoff.pk}),
+            ('"voltage law"', {kirchhoff.pk}),
+            ("ohm or coulomb", {ohm.pk, coulomb.pk}),
+            ("law -voltage", {coulomb.pk}),
+            ("kirch*", {kirchhoff.pk}),
+            ("ohm's law: (voltage) & ! | \\'", {ohm.pk}),
+        ]
+        for term, expected in cases:
+            with self.subTest(term=term):
+                self.assertEqual(expected, set(self.search_pks(term)))
+
+        # relevance ordering and headlines use the same query
+        url = self.get_url(
+            args=(self.subject2.name,),
+            search_querys={"search": "'\":!&|*", "ordering": "relevance"},
+        )
+        self.get(url, token=self.super_user["token"], status_code=status.HTTP_200_OK)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.test.testcases import TestCase
+from django.urls.base import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.tests.test_utils import TestApiBase
+from formulas import query_views, views
+from formulas.data_factories import PhotoFactory, TagFactory
+from formulas.fast_serializers import PhotoRowSerializer, get_photo_rows
+from formulas.models import Photo, PhotoClassification, Subject
+from formulas.serializers import PhotoSerializer
+
+
+class PhotoRowSerializerTest(TestApiBase, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "root", "root1234", "secret1234"
+        )
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+        cls.photo_classification = PhotoClassification.objects.create(
+            subject=Subject.objects.create(name="calculus"), exam_number=1
+        )
+        tags = [TagFactory.create(name=name) for name in ("volume", "area", "limit")]
+
+        with_files = PhotoFactory.create(
+            file=None,
+            user=cls.user,
+            photo_classification=cls.photo_classification,
+            tags=tags,
+        )
+        Photo.objects.filter(pk=with_files.pk).update(
+            file="user_1/photos/integral.png",
+            thumbnail="user_1/photos/integral_thumbnail.webp",
+        )
+        PhotoFactory.create(
+            file=None,
+            user=cls.user,
+            photo_classification=cls.photo_classification,
+            photo_context=None,
+            description="",
+            tags=tags[1:],
+        )
+        PhotoFactory.create(
+            file=None, user=cls.user, photo_classification=cls.photo_classification
+        )
+
+    def setUp(self):
+        self.init()
+
+    def render(self, serializer_class, instance, many, **context):
+        context["request"] = Request(APIRequestFactory().get("/"))
+        serializer = serializer_class(instance, many=many, context=context)
+        return JSONRenderer().render(serializer.data)
+
+    def test_same_output_as_photo_serializer(self):
+        queryset = Photo.objects.with_related().ranked()
+        self.assertEqual(
+            self.render(PhotoSerializer, queryset, many=True),
+            self.render(PhotoRowSerializer, queryset, many=True),
+        )
+
+        # with the optional review fields
+        my_reviews = {queryset[0].pk: {"pk": 1, "stars": 5}}
+        self.assertEqual(
+            self.render(PhotoSerializer, queryset, many=True, my_reviews=my_reviews),
+            self.render(PhotoRowSerializer, queryset, many=True, my_reviews=my_reviews),
+        )
+
+        for photo in queryset:
+            row = get_photo_rows(Photo.objects.filter(pk=photo.pk)).get()
+            self.assertEqual(
+                self.render(PhotoSerializer, photo, many=False),
+                self.render(PhotoRowSerializer, row, many=False),
+            )
+
+    def test_views(self):
+        photo = Photo.objects.with_related().ranked().first()
+        request = Request(APIRequestFactory().get("/"))
+        expected = PhotoSerializer(photo, context={"request": request}).data
+
+        self.get(
+            reverse(views.PhotoDetail.name, args=[photo.pk]),
+            token=self.token,
+            status_code=status.HTTP_200_OK,
+        )
+        self.assertDictEqual(expected, self.json_response)
+
+        self.get(
+            reverse(views.PhotoList.name),
+            token=self.token,
+            status_code=status.HTTP_200_OK,
+        )
+        self.assertDictEqual(expected, self.json_response["results"][0])
+
+        self.get(
+            reverse(query_views.SearchFormulaView.name, args=["calculus"]),
+            token=self.token,
+            status_code=status.HTTP_200_OK,
+        )
+        self.assertDictEqual(expected, self.json_response["results"][0])
@@ -0,0 +1,138 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test.testcases import SimpleTestCase, TestCase
+from django.urls.base import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework import status
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from communotes.parsers import MessagePackParser, ORJSONParser
+from communotes.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from core.tests.test_utils import TestApiBase
+from formulas import views
+from formulas.data_factories import PhotoFactory, UserFactory
+from formulas.models import Review
+
+DATA = {
+    "created_at": datetime.datetime(2021, 8, 1, 10, 30, 5, 123456, tzinfo=timezone.utc),
+    "date": datetime.date(2021, 8, 1),
+    "error": [ErrorDetail("not valid", code="invalid")],
+    "message": _("an user can only make one review per photo"),
+    "score": Decimal("4.50"),
+    "uuid": uuid.UUID("12345678123456781234567812345678"),
+    "text": "línea nueva",
+    "tuple": (1, 2.5, None, True),
+    1: "number key",
+}
+
+
+@skipUnless(orjson, "orjson is not installed")
+class ORJSONRendererTest(SimpleTestCase):
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(JSONRenderer().render(DATA), ORJSONRenderer().render(DATA))
+        self.assertEqual(b"", ORJSONRenderer().render(None))
+
+    def test_indent(self):
+        rendered = ORJSONRenderer().render(
+            {"pk": 1}, accepted_media_type="application/json; indent=4"
+        )
+        self.assertEqual(b'{\n  "pk": 1\n}', rendered)
+
+    def test_schema(self):
+        # the schema has lazy translations in its descriptions
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        self.assertEqual(JSONRenderer().render(schema), ORJSONRenderer().render(schema))
+
+    def test_parse(self):
+        self.assertEqual(
+            {"tags": ["área"], "stars": 5},
+            ORJSONParser().parse(BytesIO('{"tags": ["área"], "stars": 5}'.encode())),
+        )
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"stars": NaN}'))
+
+
+@skipUnless(msgpack, "msgpack is not installed")
+class MessagePackTest(TestApiBase, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "root", "root1234", "secret1234"
+        )
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+        cls.photo = PhotoFactory.create(file=None, user=UserFactory.create())
+
+    def setUp(self):
+        self.init()
+
+    def send_msgpack(self, method, url, data=None):
+        kwargs = {"HTTP_ACCEPT": "application/msgpack"}
+        if data is not None:
+            kwargs["data"] = msgpack.packb(data)
+            kwargs["content_type"] = "application/msgpack"
+        response = self.send_request(method, url, token=self.token, **kwargs)
+        self.assertEqual("application/msgpack", response["Content-Type"])
+        return response.status_code, msgpack.unpackb(response.content)
+
+    def test_render(self):
+        self.assertEqual(
+            {"score": 4.5, "created_at": "2021-08-01T10:30:05.123456Z"},
+            msgpack.unpackb(
+                MessagePackRenderer().render(
+                    {"score": DATA["score"], "created_at": DATA["created_at"]}
+                )
+            ),
+        )
+
+    def test_requests(self):
+        url = reverse(views.PhotoDetail.name, args=[self.photo.pk])
+        self.get(url, token=self.token, status_code=status.HTTP_200_OK)
+        self.assertEqual(
+            (status.HTTP_200_OK, self.json_response), self.send_msgpack("get", url)
+        )
+
+        reviews_url = reverse(views.ReviewList.name)
+        review = {"photo": self.photo.pk, "stars": 4}
+        status_code, data = self.send_msgpack("post", reviews_url, review)
+        self.assertEqual(status.HTTP_201_CREATED, status_code)
+        self.assertEqual(4, Review.objects.get(pk=data["pk"]).stars)
+
+        # translated error messages
+        status_code, data = self.send_msgpack("post", reviews_url, review)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, status_code)
+        self.assertEqual(
+            {"non_field_errors": ["an user can only make one review per photo"]}, data
+        )
+
+    def test_conditional_get(self):
+        url = reverse(views.PhotoDetail.name, args=[self.photo.pk])
+        self.get(url, token=self.token, status_code=status.HTTP_200_OK)
+        json_etag = self.response["ETag"]
+
+        # the json representation is not the msgpack one
+        kwargs = {"token": self.token, "HTTP_ACCEPT": "application/msgpack"}
+        self.get(
+            url, HTTP_IF_NONE_MATCH=json_etag, status_code=status.HTTP_200_OK, **kwargs
+        )
+        msgpack_etag = self.response["ETag"]
+        self.assertNotEqual(json_etag, msgpack_etag)
+        self.assertIn("Accept", self.response["Vary"])
+        self.get(
+            url,
+            HTTP_IF_NONE_MATCH=msgpack_etag,
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            **kwargs
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b"\xc1"))
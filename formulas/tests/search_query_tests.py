@@ -0,0 +1,75 @@
+import random
+
+from django.db import connection
+from django.test.testcases import SimpleTestCase, TestCase
+
+from formulas.search_queries import MAX_SEARCH_WORDS, parse_search_query
+
+SPECIAL_CHARACTERS = "'\"\\:!&|()<>-*@#%_=,.;~^$`{}[]?/+\t\n\x00 "
+WORDS = ["integral", "or", "OR", "the", "área", "e=mc2", "x²", "-", '"', "*"]
+
+
+class ParseSearchQueryTest(SimpleTestCase):
+    def test_syntax(self):
+        cases = [
+            ("integral volume", "'integral' & 'volume'"),
+            ('"ohm law" current', "('ohm' <-> 'law') & 'current'"),
+            ("integral or derivative", "'integral' | 'derivative'"),
+            ("integral -volume", "'integral' & !'volume'"),
+            ('limit -"by parts"', "'limit' & !('by' <-> 'parts')"),
+            ("deriv*", "'deriv':*"),
+            ("e=mc2", "('e' <-> 'mc2')"),
+            ("área OR volumen", "'área' | 'volumen'"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(expected, parse_search_query(text))
+
+    def test_operators_are_dropped(self):
+        cases = [
+            ("it's", "('it' <-> 's')"),
+            ("a:* & !b | (c)", "'a':* & 'b' & 'c'"),
+            ('"unclosed phrase', "('unclosed' <-> 'phrase')"),
+            ("or integral or", "'integral'"),
+            ("-or", "!'or'"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(expected, parse_search_query(text))
+
+    def test_without_words(self):
+        for text in ("", "   ", '- * ! \' ""', "or OR", "\x00"):
+            with self.subTest(text=text):
+                self.assertIsNone(parse_search_query(text))
+
+    def test_words_limit(self):
+        query = parse_search_query(" ".join(["word"] * (MAX_SEARCH_WORDS + 10)))
+        self.assertEqual(MAX_SEARCH_WORDS, query.count("'word'"))
+
+
+class SearchQueryFuzzTest(TestCase):
+    def get_random_text(self, rng):
+        parts = []
+        for _ in range(rng.randint(0, 12)):
+            choice = rng.random()
+            if choice < 0.4:
+                parts.append(rng.choice(SPECIAL_CHARACTERS))
+            elif choice < 0.8:
+                parts.append(rng.choice(WORDS))
+            else:
+                parts.append(chr(rng.randint(1, 0x2FFF)))
+        return "".join(parts)
+
+    def test_no_text_is_an_invalid_tsquery(self):
+        rng = random.Random(2021)
+        texts = [self.get_random_text(rng) for _ in range(2000)]
+        queries = [query for query in map(parse_search_query, texts) if query]
+        self.assertGreater(len(queries), 1000)
+
+        # to_tsquery raises a syntax error for any invalid query
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_tsquery('english', query) FROM unnest(%s::text[]) query",
+                [queries],
+            )
+            self.assertEqual(len(queries), len(cursor.fetchall()))
@@ -0,0 +1,136 @@
+import random
+import threading
+
+from django.db import connection
+from django.test.testcases import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from formulas.bulk_lookups import get_or_create_by_slugs, insert_missing_slugs
+from formulas.data_factories import TagFactory
+from formulas.models import Subject, Tag
+from formulas.serializers import PhotoSerializer
+
+
+class SlugGetOrCreateTest(TestCase):
+    def test_existing_and_missing_slugs(self):
+        existing_tag = TagFactory.create(name="area")
+        with CaptureQueriesContext(connection) as context:
+            tags = get_or_create_by_slugs(Tag, ["area", "volume", "mass", "volume"])
+
+        # a select for the existing tags and an insert for the missing ones
+        self.assertEqual(2, len(context.captured_queries))
+        self.assertEqual({"area", "volume", "mass"}, set(tags))
+        self.assertEqual(existing_tag.pk, tags["area"].pk)
+        self.assertEqual(3, Tag.objects.count())
+        self.assertEqual("mass", Tag.objects.get(pk=tags["mass"].pk).name)
+
+    def test_many_field_queries(self):
+        def validate(tag_names):
+            serializer = PhotoSerializer(
+                data={
+                    "name": "photo",
+                    "photo_classification": {"subject": "physics", "exam_number": 1},
+                    "tags": tag_names,
+                }
+            )
+            with CaptureQueriesContext(connection) as context:
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+            return serializer, len(context.captured_queries)
+
+        # the subject exists from now on
+        validate(["area"])
+        _, queries = validate(["tag-1", "tag-2"])
+        serializer, more_tags_queries = validate(
+            ["tag-%d" % number for number in range(15)]
+        )
+        self.assertEqual(queries, more_tags_queries)
+        self.assertListEqual(
+            ["tag-%d" % number for number in range(15)],
+            [tag.name for tag in serializer.validated_data["tags"]],
+        )
+        self.assertTrue(Subject.objects.filter(name="physics").exists())
+
+    def test_invalid_slugs(self):
+        serializer = PhotoSerializer(
+            data={
+                "name": "photo",
+                "photo_classification": {"subject": "physics", "exam_number": 1},
+                "tags": ["area", {"name": "volume"}],
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("tags", serializer.errors)
+
+        serializer = PhotoSerializer(
+            data={
+                "name": "photo",
+                "photo_classification": {"subject": "physics", "exam_number": 1},
+                "tags": "area",
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("tags", serializer.errors)
+
+        serializer = PhotoSerializer(
+            data={
+                "name": "photo",
+                "photo_classification": {"subject": "physics", "exam_number": 1},
+                "tags": ["area", "vol\x00ume"],
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertListEqual(["Invalid value."], serializer.errors["tags"])
+        self.assertFalse(Tag.objects.exists())
+
+
+class ConcurrentSlugGetOrCreateTest(TransactionTestCase):
+    def run_concurrently(self, target, thread_count=8):
+        barrier = threading.Barrier(thread_count)
+        errors = []
+
+        def run(number):
+            try:
+                barrier.wait()
+                target(number)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(number,))
+            for number in range(thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual([], errors)
+
+    def test_concurrent_creation(self):
+        names = ["tag-%d" % number for number in range(20)]
+        results = []
+
+        def create_tags(number):
+            # each request lists the tags in its own order
+            shuffled_names = random.Random(number).sample(names, len(names))
+            tags = get_or_create_by_slugs(Tag, shuffled_names)
+            results.append({name: tag.pk for name, tag in tags.items()})
+
+        self.run_concurrently(create_tags)
+        self.assertEqual(8, len(results))
+        expected = dict(Tag.objects.values_list("name", "pk"))
+        self.assertEqual(len(names), len(expected))
+        for result in results:
+            self.assertDictEqual(expected, result)
+
+    def test_concurrent_inserts_in_any_order(self):
+        names = ["tag-%d" % number for number in range(2000)]
+
+        def insert_tags(number):
+            # opposite orders deadlock unless the rows are inserted sorted
+            ordered_names = names if number % 2 else names[::-1]
+            insert_missing_slugs(Tag, "name", ordered_names)
+
+        self.run_concurrently(insert_tags)
+        self.assertEqual(len(names), Tag.objects.count())
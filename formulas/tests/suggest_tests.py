@@ -0,0 +1,94 @@
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.test.testcases import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django.urls.base import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.tests.test_utils import TestApiBase
+from formulas import query_views
+from formulas.data_factories import PhotoFactory, TagFactory
+from formulas.models import PhotoClassification, PhotoContext, Subject
+from formulas.suggestions import PrefixIndex
+
+
+class PrefixIndexTest(SimpleTestCase):
+    def test_search(self):
+        index = PrefixIndex(
+            [("area", 1), ("Arc", 5), ("argument", 5), ("volume", 9), ("", 3)],
+            version=(1,),
+        )
+        self.assertListEqual(
+            [("Arc", 5), ("argument", 5), ("area", 1)], index.search("AR", 10)
+        )
+        self.assertListEqual([("Arc", 5)], index.search("ar", 1))
+        self.assertListEqual([("area", 1)], index.search("are", 10))
+        self.assertListEqual([], index.search("x", 10))
+        # memoized short prefixes return the same results
+        self.assertListEqual([("Arc", 5)], index.search("ar", 1))
+        # only ascii prefixes at the default limit are memoized
+        self.assertListEqual([], index.search("é", 10))
+        self.assertListEqual(["ar", "x"], sorted(index.short_prefix_results))
+
+
+@override_settings(SUGGEST_REFRESH_INTERVAL=0, BACKGROUND_TASKS_SYNC=True)
+class SuggestTest(TestApiBase, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "root", "root1234", "secret1234"
+        )
+        cls.token = str(RefreshToken.for_user(cls.user).access_token)
+
+    def setUp(self):
+        self.init()
+
+    def suggest(self, status_code=status.HTTP_200_OK, **query):
+        url = reverse(query_views.SuggestView.name) + "?" + urlencode(query)
+        self.get(url, token=self.token, status_code=status_code)
+        return self.json_response
+
+    def test_suggest_by_usage(self):
+        area, arc = TagFactory.create(name="area"), TagFactory.create(name="arc")
+        TagFactory.create(name="volume")
+        PhotoFactory.create(file=None, user=self.user, tags=[area, arc])
+        PhotoFactory.create(file=None, user=self.user, tags=[arc])
+
+        self.assertDictEqual(
+            {"tag": [{"name": "arc", "usage": 2}, {"name": "area", "usage": 1}]},
+            self.suggest(q="Ar", kind="tag"),
+        )
+
+        # a new usage is visible after the index is rebuilt
+        PhotoFactory.create(file=None, user=self.user, tags=[area])
+        PhotoFactory.create(file=None, user=self.user, tags=[area])
+        self.assertListEqual(
+            ["area", "arc"],
+            [item["name"] for item in self.suggest(q="ar", kind="tag")["tag"]],
+        )
+        self.assertEqual(1, len(self.suggest(q="ar", kind="tag", limit=1)["tag"]))
+
+    def test_suggest_all_kinds(self):
+        subject = Subject.objects.create(name="calculus")
+        PhotoFactory.create(
+            file=None,
+            user=self.user,
+            photo_classification=PhotoClassification.objects.create(
+                subject=subject, exam_number=1
+            ),
+            photo_context=PhotoContext.objects.create(professor="Carla"),
+        )
+        TagFactory.create(name="cable")
+
+        response = self.suggest(q="ca")
+        self.assertListEqual(["tag", "subject", "professor"], list(response))
+        self.assertListEqual([{"name": "cable", "usage": 0}], response["tag"])
+        self.assertListEqual([{"name": "calculus", "usage": 1}], response["subject"])
+        self.assertListEqual([{"name": "Carla", "usage": 1}], response["professor"])
+
+    def test_invalid_query(self):
+        self.suggest(status_code=status.HTTP_400_BAD_REQUEST)
+        self.suggest(q="a", kind="photo", status_code=status.HTTP_400_BAD_REQUEST)
+        self.suggest(q="a", limit=500, status_code=status.HTTP_400_BAD_REQUEST)
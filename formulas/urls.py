@@ -4,6 +4,11 @@ from formulas import query_views, views
 
 urlpatterns = [
     path("photos/", views.PhotoList.as_view(), name=views.PhotoList.name),
+    path(
+        "photos/bulk/",
+        views.PhotoBulkCreate.as_view(),
+        name=views.PhotoBulkCreate.name,
+    ),
     re_path(
         r"^photos/(?P<pk>[0-9]+)$",
         views.PhotoDetail.as_view(),
@@ -31,6 +36,11 @@ urlpatterns = [
     ),
     path("profile/", views.ProfileDetail.as_view(), name=views.ProfileDetail.name),
     path("reviews/", views.ReviewList.as_view(), name=views.ReviewList.name),
+    path(
+        "reviews/upsert/",
+        views.ReviewUpsert.as_view(),
+        name=views.ReviewUpsert.name,
+    ),
     re_path(
         r"^reviews/(?P<pk>[0-9]+)$",
         views.ReviewDetail.as_view(),
@@ -56,4 +66,24 @@ urlpatterns = [
         query_views.SearchFormulaView.as_view(),
         name=query_views.SearchFormulaView.name,
     ),
+    re_path(
+        r"^leaderboards/(?P<subject>[-a-zA-Z0-9_]+)$",
+        query_views.LeaderboardView.as_view(),
+        name=query_views.LeaderboardView.name,
+    ),
+    re_path(
+        r"^leaderboards/(?P<subject>[-a-zA-Z0-9_]+)/(?P<exam_number>[1-6])$",
+        query_views.LeaderboardView.as_view(),
+        name=query_views.LeaderboardView.name,
+    ),
+    re_path(
+        r"^facets/(?P<subject>[-a-zA-Z0-9_]+)$",
+        query_views.FacetsView.as_view(),
+        name=query_views.FacetsView.name,
+    ),
+    path(
+        "suggest/",
+        query_views.SuggestView.as_view(),
+        name=query_views.SuggestView.name,
+    ),
 ]
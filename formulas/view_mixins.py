@@ -0,0 +1,230 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from formulas import cache_versions
+from formulas.fast_serializers import PhotoRowSerializer, get_photo_rows
+from formulas.models import Review
+from formulas.serializers import PhotoSerializer
+
+
+class CachedResponseMixin:
+    """
+    Cache the response data of list and retrieve actions, the cache key
+    contains the versions of `cache_dependencies`, a version is bumped
+    each time a model it names changes, so stale entries are never read
+    """
+
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, get_response, request, *args, **kwargs):
+        cache = cache_versions.get_cache()
+        cache_key = self.get_response_cache_key(request)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = get_response(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+            cache.set(cache_key, response.data, timeout)
+        return response
+
+    def get_response_cache_key(self, request):
+        versions = cache_versions.get_versions(self.cache_dependencies)
+        # the absolute uri because the pagination links contain the host
+        key = "|".join([self.name, request.build_absolute_uri(), *map(str, versions)])
+        return "formulas:response:" + hashlib.md5(key.encode()).hexdigest()
+
+
+def get_timestamp(*datetimes):
+    datetimes = [value for value in datetimes if value is not None]
+    if not datetimes:
+        return None
+    return timegm(max(datetimes).utctimetuple())
+
+
+def make_etag(*values):
+    return '"{0}"'.format(hashlib.md5(repr(values).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with 304 Not Modified when the ETag or Last-Modified
+    sent by the client are still valid, the validators come from cheap
+    queries that run before the response is serialized
+    """
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if etag is not None:
+            # each renderer makes a different representation of the same data
+            etag = make_etag(etag, request.accepted_renderer.media_type)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            if etag is not None:
+                response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    def get_validators(self, request):
+        """
+        Return the ETag and the last modification timestamp, or None
+        """
+        raise NotImplementedError("get_validators() must be implemented")
+
+
+class PhotoDetailConditionalGetMixin(ConditionalGetMixin):
+    def get_validators(self, request):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        photo = (
+            self.get_queryset()
+            .order_by()
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values("pk", "updated_at", "last_reviewed_at", "total_reviews")
+            .first()
+        )
+        # not found, the view answers with 404
+        if photo is None:
+            return None, None
+        etag = make_etag(*photo.values())
+        return etag, get_timestamp(photo["updated_at"], photo["last_reviewed_at"])
+
+
+class PhotoListConditionalGetMixin(ConditionalGetMixin):
+    filtered_queryset = None
+
+    def filter_queryset(self, queryset):
+        # the filters already ran for the validators
+        if self.filtered_queryset is not None:
+            return self.filtered_queryset
+        return super().filter_queryset(queryset)
+
+    def get_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        self.filtered_queryset = queryset
+        # the validators cost an exact count, only the pages that count the
+        # photos anyway have them and the paginator reuses the count
+        paginator = self.paginator
+        if paginator is None or not paginator.counts_exactly(queryset, request, self):
+            return None, None
+        aggregate = queryset.order_by().aggregate(
+            count=Count("pk"),
+            max_pk=Max("pk"),
+            max_updated_at=Max("updated_at"),
+            max_last_reviewed_at=Max("last_reviewed_at"),
+            sum_total_reviews=Sum("total_reviews"),
+        )
+        paginator.exact_count = aggregate["count"]
+        etag = make_etag(request.get_full_path(), *aggregate.values())
+        last_modified = get_timestamp(
+            aggregate["max_updated_at"], aggregate["max_last_reviewed_at"]
+        )
+        return etag, last_modified
+
+
+class PhotoRowsMixin:
+    """
+    Render the photos of GET requests with PhotoRowSerializer, the page is
+    read as values() rows instead of model instances. Only for the views
+    whose serializer is PhotoSerializer
+    """
+
+    def uses_photo_rows(self):
+        # the schema generator documents the views with PhotoSerializer
+        return (
+            self.request.method == "GET"
+            and self.get_serializer_class() is PhotoSerializer
+            and not getattr(self, "swagger_fake_view", False)
+        )
+
+    def get_object(self):
+        if not self.uses_photo_rows():
+            return super().get_object()
+
+        queryset = get_photo_rows(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(self.request, row)
+        return row
+
+    def paginate_queryset(self, queryset):
+        if self.uses_photo_rows():
+            queryset = get_photo_rows(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.uses_photo_rows():
+            kwargs.setdefault("context", self.get_serializer_context())
+            return PhotoRowSerializer(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+
+class MyReviewMixin:
+    """
+    With ?my_review=true the photos include the review of the request user
+    and their review count, the reviews of the page are loaded with one query
+    """
+
+    my_review_query_param = "my_review"
+    my_reviews = None
+
+    def is_my_review_requested(self):
+        value = self.request.query_params.get(self.my_review_query_param, "")
+        return self.request.method == "GET" and value.lower() in ("true", "1")
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.is_my_review_requested():
+            self.my_reviews = self.get_my_reviews(page)
+        return page
+
+    def get_object(self):
+        photo = super().get_object()
+        if self.is_my_review_requested():
+            self.my_reviews = self.get_my_reviews([photo])
+        return photo
+
+    def get_my_reviews(self, photos):
+        # model instances or values() rows
+        photo_pks = [
+            photo["id"] if isinstance(photo, dict) else photo.pk for photo in photos
+        ]
+        reviews = Review.objects.filter(
+            user=self.request.user, photo_id__in=photo_pks
+        ).values_list("photo_id", "pk", "stars")
+        return {photo_pk: {"pk": pk, "stars": stars} for photo_pk, pk, stars in reviews}
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.my_reviews is not None:
+            context["my_reviews"] = self.my_reviews
+        return context
+
+    def get_validators(self, request):
+        # the responses with a review differ between users
+        etag, last_modified = super().get_validators(request)
+        if etag is not None and self.is_my_review_requested():
+            etag = make_etag(etag, request.user.pk)
+        return etag, last_modified
@@ -1,10 +1,15 @@
+import json
+
+from django.db import transaction
 from django.db.utils import IntegrityError
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema_view
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from formulas import image_variants, leaderboards, review_scores, storage_deletions
 from formulas.custom_filters import PhotoClassificationFilter, PhotoFilter, ReviewFilter
 from formulas.custom_permissions import IsCurrentUserOwnerOrReadOnly
 from formulas.docs import (
@@ -17,6 +22,7 @@ from formulas.docs import (
     tag_docs,
 )
 from formulas.models import (
+    PHOTO_RANKING_ORDERING,
     Photo,
     PhotoClassification,
     PhotoContext,
@@ -26,19 +32,33 @@ from formulas.models import (
     Tag,
 )
 from formulas.serializers import (
+    PhotoBulkItemSerializer,
     PhotoClassificationSerializer,
     PhotoContextSerializer,
     PhotoSerializer,
     ProfileSerializer,
     ReviewSerializer,
+    ReviewUpsertSerializer,
     SubjectSerializer,
     TagSerializer,
 )
+from formulas.view_mixins import (
+    CachedResponseMixin,
+    MyReviewMixin,
+    PhotoDetailConditionalGetMixin,
+    PhotoListConditionalGetMixin,
+    PhotoRowsMixin,
+)
 
 
 @extend_schema_view(**photo_docs.custom_schema.get_list_view_schema())
-class PhotoList(generics.ListCreateAPIView):
-    queryset = Photo.objects.all()
+class PhotoList(
+    MyReviewMixin,
+    PhotoRowsMixin,
+    PhotoListConditionalGetMixin,
+    generics.ListCreateAPIView,
+):
+    queryset = Photo.objects.with_related().ranked()
     serializer_class = PhotoSerializer
     name = "photo-list"
 
@@ -47,10 +67,12 @@ class PhotoList(generics.ListCreateAPIView):
     ]
 
     filterset_class = PhotoFilter
+    keyset_ordering = PHOTO_RANKING_ORDERING
+    estimate_count = True
 
     search_fields = (
-        "$name",
-        "$description",
+        "name",
+        "description",
     )
     ordering_fields = (
         "created_at",
@@ -58,12 +80,19 @@ class PhotoList(generics.ListCreateAPIView):
     )
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        photo = serializer.save(user=self.request.user)
+        image_variants.schedule_photo_variants(photo)
+        leaderboards.schedule_photo_refresh(photo.pk)
 
 
 @extend_schema_view(**photo_docs.custom_schema.get_detail_view_schema())
-class PhotoDetail(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Photo.objects.all()
+class PhotoDetail(
+    MyReviewMixin,
+    PhotoRowsMixin,
+    PhotoDetailConditionalGetMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
+    queryset = Photo.objects.with_related()
     serializer_class = PhotoSerializer
     name = "photo-detail"
 
@@ -72,17 +101,99 @@ class PhotoDetail(generics.RetrieveUpdateDestroyAPIView):
         IsCurrentUserOwnerOrReadOnly,
     ]
 
+    def perform_update(self, serializer):
+        old_classification = serializer.instance.photo_classification
+        with transaction.atomic():
+            photo = serializer.save()
+            if "file" in serializer.validated_data:
+                image_variants.schedule_photo_variants(photo)
+            if photo.photo_classification_id != old_classification.pk:
+                leaderboards.schedule_subjects_refresh(
+                    [
+                        old_classification.subject_id,
+                        photo.photo_classification.subject_id,
+                    ]
+                )
+
     def perform_destroy(self, instance):
-        instance.file.delete()
-        instance.delete()
+        # the files are deleted in the background after the commit
+        with transaction.atomic():
+            storage_deletions.enqueue_deletion(
+                instance.file.name, *image_variants.get_variant_names(instance)
+            )
+            in_leaderboards = instance.leaderboard_entries.exists()
+            instance.delete()
+            if in_leaderboards:
+                leaderboards.schedule_subjects_refresh(
+                    [instance.photo_classification.subject_id]
+                )
+
+
+@extend_schema_view(post=photo_docs.bulk_create_schema)
+class PhotoBulkCreate(generics.CreateAPIView):
+    queryset = Photo.objects.all()
+    serializer_class = PhotoBulkItemSerializer
+    name = "photo-bulk"
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs["many"] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=self.get_photos_data(request))
+        serializer.is_valid(raise_exception=True)
+        photos = serializer.save(user=request.user)
+        for photo in photos:
+            image_variants.schedule_photo_variants(photo)
+        leaderboards.schedule_subjects_refresh(
+            photo.photo_classification.subject_id for photo in photos
+        )
+
+        # reload the photos with everything PhotoSerializer renders
+        photo_pks = [photo.pk for photo in photos]
+        photos = Photo.objects.with_related().in_bulk(photo_pks)
+        response_serializer = PhotoSerializer(
+            [photos[pk] for pk in photo_pks],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+    def get_photos_data(self, request):
+        """
+        JSON requests send the list of photos, multipart requests send it
+        as a JSON string in the photos field and the image of the photo
+        at index i in the file_<i> field
+        """
+        photos_data = request.data
+        if hasattr(request.data, "getlist"):
+            try:
+                photos_data = json.loads(request.data.get("photos", ""))
+            except ValueError:
+                raise ValidationError(
+                    {"photos": [_("The photos field must be a JSON list")]}
+                )
+
+        if isinstance(photos_data, list):
+            for index, photo_data in enumerate(photos_data):
+                file_key = "file_{0}".format(index)
+                if isinstance(photo_data, dict) and file_key in request.FILES:
+                    photo_data["file"] = request.FILES[file_key]
+        return photos_data
 
 
 @extend_schema_view(**photo_classification_docs.custom_schema.get_list_view_schema())
-class PhotoClassificationList(generics.ListCreateAPIView):
+class PhotoClassificationList(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = PhotoClassification.objects.all()
     serializer_class = PhotoClassificationSerializer
     name = "photoclassification-list"
 
+    cache_dependencies = ("photoclassification", "subject")
+
     permission_classes = [
         IsAuthenticated,
     ]
@@ -93,11 +204,13 @@ class PhotoClassificationList(generics.ListCreateAPIView):
 
 
 @extend_schema_view(**photo_classification_docs.custom_schema.get_detail_view_schema())
-class PhotoClassificationDetail(generics.RetrieveAPIView):
+class PhotoClassificationDetail(CachedResponseMixin, generics.RetrieveAPIView):
     queryset = PhotoClassification.objects.all()
     serializer_class = PhotoClassificationSerializer
     name = "photoclassification-detail"
 
+    cache_dependencies = ("photoclassification", "subject")
+
     permission_classes = [
         IsAuthenticated,
     ]
@@ -150,6 +263,8 @@ class ReviewList(generics.ListCreateAPIView):
     ]
 
     filterset_class = ReviewFilter
+    keyset_ordering = ("id",)
+    estimate_count = True
 
     ordering_fields = ("stars",)
 
@@ -163,7 +278,31 @@ class ReviewList(generics.ListCreateAPIView):
             )
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            review_scores.add_review_score(review.photo_id, review.stars)
+
+
+@extend_schema_view(put=review_docs.upsert_schema)
+class ReviewUpsert(generics.GenericAPIView):
+    serializer_class = ReviewUpsertSerializer
+    name = "review-upsert"
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+
+    def put(self, request, *args, **kwargs):
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+
+        created = not many and serializer.instance["created"]
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
 
 
 @extend_schema_view(**review_docs.custom_schema.get_detail_view_schema())
@@ -177,52 +316,90 @@ class ReviewDetail(generics.RetrieveUpdateDestroyAPIView):
         IsCurrentUserOwnerOrReadOnly,
     ]
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # lock the review so concurrent updates see the stars we replace
+            old_review = (
+                Review.objects.select_for_update()
+                .values("photo_id", "stars")
+                .get(pk=serializer.instance.pk)
+            )
+            review = serializer.save()
+            review_scores.change_review_score(
+                old_review["photo_id"],
+                old_review["stars"],
+                review.photo_id,
+                review.stars,
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # lock the review, the stars of instance may be changed meanwhile
+            review = (
+                Review.objects.select_for_update()
+                .filter(pk=instance.pk)
+                .values("photo_id", "stars")
+                .first()
+            )
+            if review is None:
+                return
+            Review.objects.filter(pk=instance.pk).delete()
+            review_scores.remove_review_score(review["photo_id"], review["stars"])
+
 
 @extend_schema_view(**subject_docs.custom_schema.get_list_view_schema())
-class SubjectList(generics.ListCreateAPIView):
+class SubjectList(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     name = "subject-list"
 
+    cache_dependencies = ("subject",)
+
     permission_classes = [
         IsAuthenticated,
     ]
 
-    search_fields = ("$name",)
+    search_fields = ("name",)
     ordering_fields = ("name",)
 
 
 @extend_schema_view(**subject_docs.custom_schema.get_detail_view_schema())
-class SubjectDetail(generics.RetrieveAPIView):
+class SubjectDetail(CachedResponseMixin, generics.RetrieveAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     name = "subject-detail"
 
+    cache_dependencies = ("subject",)
+
     permission_classes = [
         IsAuthenticated,
     ]
 
 
 @extend_schema_view(**tag_docs.custom_schema.get_list_view_schema())
-class TagList(generics.ListCreateAPIView):
+class TagList(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     name = "tag-list"
 
+    cache_dependencies = ("tag",)
+
     permission_classes = [
         IsAuthenticated,
     ]
 
-    search_fields = ("$name",)
+    search_fields = ("name",)
     ordering_fields = ("name",)
 
 
 @extend_schema_view(**tag_docs.custom_schema.get_detail_view_schema())
-class TagDetail(generics.RetrieveAPIView):
+class TagDetail(CachedResponseMixin, generics.RetrieveAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     name = "tag-detail"
 
+    cache_dependencies = ("tag",)
+
     permission_classes = [
         IsAuthenticated,
     ]